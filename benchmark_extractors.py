@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Extractor Benchmark
+Builds synthetic schemas (tables with foreign keys, indexes, RLS policies and
+functions) in a throwaway PostgreSQL instance and runs every extractor on
+them: SupabaseSchemaExtractor (bulk and per table), extract_schema_direct and
+the REST extractor against a local stand-in for PostgREST. Each run records
+wall time, query count, bytes written and peak RSS; results are appended to
+a history file and runs that got worse than their recent history are flagged.
+
+With --incremental it also times full versus incremental extraction, showing
+that an incremental run costs in proportion to the number of changed tables
+rather than the size of the schema.
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import contextlib
+import statistics
+import psycopg2
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from psycopg2.extensions import cursor as TupleCursor, make_dsn, ISOLATION_LEVEL_AUTOCOMMIT
+from psycopg2.extras import RealDictCursor
+from typing import Dict, Any, List, Optional
+from extract_schema_direct import extract_catalog, generate_sql_dump
+from extract_supabase_schema import SupabaseSchemaExtractor
+from extract_schema_via_api import SupabaseSQLExtractor
+
+EXTRACTORS = ["supabase_schema_bulk", "supabase_schema", "direct", "rest", "rest_pipelined"]
+DEFAULT_SIZES = "100,1000,10000"
+DEFAULT_HISTORY_FILE = "benchmark_history.jsonl"
+REST_CONCURRENCY = 8
+# Tables created per transaction; one transaction for 10,000 tables would
+# exhaust the lock table (max_locks_per_transaction * max_connections).
+BUILD_BATCH = 500
+# Recent runs the wall time and peak RSS of a new run are compared against.
+HISTORY_WINDOW = 5
+
+
+class CountingCursor(TupleCursor):
+    """Tuple cursor, as the extractors use, that counts the queries it executes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = 0
+
+    def execute(self, query, vars=None):
+        self.queries += 1
+        return super().execute(query, vars)
+
+
+def find_pg_bin(pg_bin: Optional[str] = None) -> Optional[str]:
+    """Return the directory holding initdb and pg_ctl, or None if not found."""
+    if pg_bin:
+        return pg_bin
+    initdb = shutil.which("initdb")
+    if initdb:
+        return os.path.dirname(initdb)
+    try:
+        return subprocess.run(["pg_config", "--bindir"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class ThrowawayPostgres:
+    """A temporary PostgreSQL cluster listening only on a private unix socket.
+
+    Durability is switched off since nothing in it needs to survive; the
+    cluster and its directory are removed on exit.
+    """
+
+    def __init__(self, pg_bin: str):
+        self.pg_bin = pg_bin
+        self.directory = None
+        self.url = None
+
+    def _run(self, program: str, *args: str):
+        subprocess.run([os.path.join(self.pg_bin, program), *args],
+                       capture_output=True, text=True, check=True)
+
+    def __enter__(self) -> 'ThrowawayPostgres':
+        self.directory = tempfile.mkdtemp(prefix="schema_benchmark_")
+        data = os.path.join(self.directory, "data")
+        options = (f"-k {self.directory} -c listen_addresses='' -c fsync=off "
+                   f"-c synchronous_commit=off -c full_page_writes=off")
+        try:
+            self._run("initdb", "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync")
+            self._run("pg_ctl", "-D", data, "-l", os.path.join(self.directory, "postgres.log"),
+                      "-o", options, "-w", "start")
+        except subprocess.CalledProcessError as e:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            raise RuntimeError(e.stderr.strip() or e.stdout.strip()) from e
+        self.url = make_dsn(host=self.directory, user="postgres", dbname="postgres")
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self._run("pg_ctl", "-D", os.path.join(self.directory, "data"), "-m", "immediate", "-w", "stop")
+        finally:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class RestStandIn:
+    """Local stand-in for PostgREST's /rest/v1/rpc/<function> endpoint.
+
+    POST /rpc/sql runs {"query": ...} and returns the rows as JSON; any other
+    function is called as public.<function>(). Each HTTP connection gets its
+    own database connection, and `latency` seconds are added per request to
+    mimic the round trip to a hosted project.
+    """
+
+    def __init__(self, db_url: str, latency: float = 0.0):
+        self.db_url = db_url
+        self.latency = latency
+        self.requests = 0
+        self.server = None
+        self.url = None
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _handler(self):
+        stand_in = self
+        local = threading.local()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b"{}")
+                if stand_in.latency:
+                    time.sleep(stand_in.latency)
+                with stand_in._lock:
+                    stand_in.requests += 1
+                if not hasattr(local, 'conn'):
+                    local.conn = psycopg2.connect(stand_in.db_url)
+                    local.conn.autocommit = True
+                    with stand_in._lock:
+                        stand_in._connections.append(local.conn)
+
+                function_name = self.path.rsplit('/', 1)[-1]
+                try:
+                    with local.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                        if function_name == "sql":
+                            cursor.execute(body['query'])
+                            result = cursor.fetchall() if cursor.description else []
+                        else:
+                            cursor.execute(f"SELECT public.{function_name}() AS result")
+                            result = cursor.fetchone()['result']
+                    status, payload = 200, json.dumps(result, default=str)
+                except psycopg2.Error as e:
+                    status, payload = 400, json.dumps({"message": str(e).strip()})
+
+                data = payload.encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The extractor was killed on timeout while waiting for this reply.
+                    pass
+
+        return Handler
+
+    def __enter__(self) -> 'RestStandIn':
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        for conn in self._connections:
+            conn.close()
+
+
+def recreate_database(admin_url: str, name: str, drop_only: bool = False):
+    """Drop the scratch database and, unless drop_only, create it empty."""
+    conn = psycopg2.connect(admin_url)
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {name}")
+            if not drop_only:
+                cursor.execute(f"CREATE DATABASE {name}")
+    finally:
+        conn.close()
+
+
+def build_synthetic_schema(conn, tables: int):
+    """Create `tables` keyed, indexed tables, each referencing the previous one.
+
+    Every table has row level security with a read policy, and every tenth
+    table gets a function summing its amounts.
+    """
+    with conn.cursor() as cursor:
+        for start in range(0, tables, BUILD_BATCH):
+            statements = []
+            for i in range(start, min(start + BUILD_BATCH, tables)):
+                name = f"bench_{i:05d}"
+                parent = f",\n    parent_id INTEGER REFERENCES bench_{i - 1:05d}(id) ON DELETE CASCADE" if i else ""
+                statements.append(f"""CREATE TABLE {name} (
+    id SERIAL PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    amount NUMERIC(10,2) DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT now(){parent}
+);
+CREATE INDEX {name}_created_idx ON {name} (created_at);
+ALTER TABLE {name} ENABLE ROW LEVEL SECURITY;
+CREATE POLICY {name}_read ON {name} FOR SELECT USING (amount >= 0);""")
+                if i % 10 == 0:
+                    statements.append(f"""CREATE FUNCTION {name}_total() RETURNS NUMERIC
+LANGUAGE sql STABLE AS $$ SELECT coalesce(sum(amount), 0) FROM {name} $$;""")
+            cursor.execute("\n".join(statements))
+            conn.commit()
+
+
+def alter_tables(conn, tables: int, count: int, round_no: int):
+    """Add a column to `count` tables spread evenly across the schema."""
+    if count == 0:
+        return
+    step = max(tables // count, 1)
+    with conn.cursor() as cursor:
+        for i in range(0, step * count, step):
+            cursor.execute(f"ALTER TABLE bench_{i:05d} ADD COLUMN extra_{round_no} INTEGER")
+    conn.commit()
+
+
+def timed_extract(conn, previous: Dict[str, Any] = None):
+    """Run extract_catalog quietly; return (catalog, seconds, queries)."""
+    with conn.cursor(cursor_factory=CountingCursor) as cursor:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            catalog = extract_catalog(cursor, previous=previous)
+            elapsed = time.perf_counter() - started
+    conn.commit()
+    return catalog, elapsed, cursor.queries
+
+
+def run_benchmark(conn, tables: int, changes: List[int]) -> bool:
+    """Time a full extraction, then one incremental run per change size."""
+    print(f"\n{'Run':<14}{'Changed':>9}{'Time (s)':>11}{'Queries':>10}")
+    print("-" * 44)
+
+    catalog, elapsed, queries = timed_extract(conn)
+    print(f"{'full':<14}{tables:>9}{elapsed:>11.2f}{queries:>10}")
+
+    for round_no, count in enumerate(changes, 1):
+        alter_tables(conn, tables, count, round_no)
+        catalog, elapsed, queries = timed_extract(conn, previous=catalog)
+        print(f"{'incremental':<14}{count:>9}{elapsed:>11.2f}{queries:>10}")
+
+    # The spliced catalog must describe the schema exactly as a full run does.
+    full_catalog, _, _ = timed_extract(conn)
+    if full_catalog != catalog:
+        print("\n✗ Incremental catalog differs from a full extraction")
+        return False
+    print("\n✓ Incremental catalog matches a full extraction")
+    return True
+
+
+def run_extractor(extractor: str, db_url: str, output_file: str, rest_url: str = None) -> Dict[str, Any]:
+    """Run one extractor to completion and return its seconds, queries and bytes.
+
+    This runs in a child process (see measure_extractor) so that the peak
+    RSS reported for it belongs to this extractor alone.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        if extractor in ("supabase_schema", "supabase_schema_bulk"):
+            schema_extractor = SupabaseSchemaExtractor(db_url, bulk=extractor.endswith("_bulk"))
+            schema_extractor.connect()
+            try:
+                succeeded = schema_extractor.generate_sql_dump(output_file)
+            finally:
+                schema_extractor.close()
+            queries = schema_extractor.round_trips
+        elif extractor == "direct":
+            conn = psycopg2.connect(db_url)
+            try:
+                with conn.cursor(cursor_factory=CountingCursor) as cursor:
+                    generate_sql_dump(cursor, output_file)
+                    queries = cursor.queries
+            finally:
+                conn.close()
+            succeeded = True
+        elif extractor in ("rest", "rest_pipelined"):
+            api_extractor = SupabaseSQLExtractor(rest_url, "benchmark", pool_size=REST_CONCURRENCY)
+            calls = []
+            call_rpc = api_extractor.call_rpc
+
+            def counted_call_rpc(function_name, payload=None):
+                calls.append(function_name)
+                return call_rpc(function_name, payload)
+
+            api_extractor.call_rpc = counted_call_rpc
+            if extractor == "rest":
+                succeeded = api_extractor.extract_complete_schema(output_file)
+            else:
+                succeeded = api_extractor.extract_complete_schema_pipelined(output_file, REST_CONCURRENCY)
+            queries = len(calls)
+        else:
+            raise ValueError(f"Unknown extractor: {extractor}")
+        elapsed = time.perf_counter() - started
+
+    if not succeeded:
+        raise RuntimeError(f"{extractor} did not produce a dump")
+    return {
+        "seconds": round(elapsed, 3),
+        "queries": queries,
+        "bytes": os.path.getsize(output_file),
+    }
+
+
+def measure_extractor(extractor: str, db_url: str, output_file: str, rest_url: str = None,
+                      timeout: float = None) -> Dict[str, Any]:
+    """Run an extractor in a child process; return its metrics, status and peak RSS.
+
+    The child is reaped with wait4 to read its peak RSS, and killed if it
+    runs longer than `timeout` seconds.
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--run-extractor", extractor,
+               "--database-url", db_url, "--output", output_file]
+    if rest_url:
+        command += ["--rest-url", rest_url]
+
+    started = time.perf_counter()
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        child = subprocess.Popen(command, stdout=stdout, stderr=stderr)
+        timer = threading.Timer(timeout, child.kill) if timeout else None
+        if timer:
+            timer.start()
+        try:
+            _, status, usage = os.wait4(child.pid, 0)
+        finally:
+            if timer:
+                timer.cancel()
+        child.returncode = os.waitstatus_to_exitcode(status)
+        elapsed = time.perf_counter() - started
+
+        stdout.seek(0)
+        stderr.seek(0)
+        output = stdout.read().decode('utf-8', 'replace').strip()
+        errors = stderr.read().decode('utf-8', 'replace').strip()
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak_rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    result = {"status": "ok", "peak_rss_mb": round(peak_rss / 1024 / 1024, 1)}
+
+    if timer and elapsed >= timeout and child.returncode < 0:
+        result.update(status="timeout", seconds=round(elapsed, 3))
+    elif child.returncode != 0:
+        last_line = errors.splitlines()[-1] if errors else f"exit code {child.returncode}"
+        result.update(status="failed", seconds=round(elapsed, 3), error=last_line)
+    else:
+        result.update(json.loads(output.splitlines()[-1]))
+    return result
+
+
+def current_revision() -> Optional[str]:
+    """Return the short git revision of the extractors being benchmarked, if known."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(history_file: str) -> List[Dict[str, Any]]:
+    """Read previous benchmark records (one JSON object per line)."""
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(history_file: str, records: List[Dict[str, Any]]):
+    """Append benchmark records to the history file."""
+    with open(history_file, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def find_regressions(record: Dict[str, Any], history: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """Compare a run with earlier successful runs of the same extractor and size.
+
+    Wall time and peak RSS are compared against the median of the last
+    HISTORY_WINDOW runs and flagged beyond `threshold` (a fraction); query
+    counts are deterministic, so any increase over the last run is flagged.
+    """
+    previous = [
+        earlier for earlier in history
+        if earlier['extractor'] == record['extractor'] and earlier['tables'] == record['tables']
+        and earlier['status'] == "ok"
+    ][-HISTORY_WINDOW:]
+    if not previous:
+        return []
+    if record['status'] != "ok":
+        return [f"{record['status']} (previously ok)"]
+
+    regressions = []
+    for metric, unit in (("seconds", "s"), ("peak_rss_mb", "MB")):
+        baseline = statistics.median(earlier[metric] for earlier in previous)
+        if baseline and record[metric] > baseline * (1 + threshold):
+            regressions.append(f"{metric} {record[metric]:.2f} {unit} vs median {baseline:.2f} {unit} "
+                               f"(+{(record[metric] / baseline - 1) * 100:.0f}%)")
+    if record['queries'] > previous[-1]['queries']:
+        regressions.append(f"queries {record['queries']} vs {previous[-1]['queries']}")
+    return regressions
+
+
+def benchmark_size(admin_url: str, database: str, tables: int, extractors: List[str],
+                   output_dir: str, timeout: float, rest_latency: float) -> List[Dict[str, Any]]:
+    """Build a synthetic schema of `tables` tables and measure every extractor on it."""
+    db_url = make_dsn(admin_url, dbname=database)
+    conn = psycopg2.connect(db_url)
+    try:
+        started = time.perf_counter()
+        build_synthetic_schema(conn, tables)
+    finally:
+        conn.close()
+    print(f"\n✓ Built {tables:,} synthetic tables in {time.perf_counter() - started:.1f} s")
+
+    print(f"{'Extractor':<22}{'Time (s)':>10}{'Queries':>10}{'Bytes':>14}{'Peak RSS (MB)':>15}")
+    print("-" * 71)
+
+    records = []
+    with RestStandIn(db_url, rest_latency) as stand_in:
+        for extractor in extractors:
+            output_file = os.path.join(output_dir, f"{extractor}_{tables}.sql")
+            rest_url = stand_in.url if extractor.startswith("rest") else None
+            result = measure_extractor(extractor, db_url, output_file, rest_url, timeout)
+            record = {"extractor": extractor, "tables": tables, **result}
+            records.append(record)
+
+            if record['status'] == "ok":
+                print(f"{extractor:<22}{record['seconds']:>10.2f}{record['queries']:>10,}"
+                      f"{record['bytes']:>14,}{record['peak_rss_mb']:>15.1f}")
+            else:
+                detail = record.get('error', f"after {record['seconds']:.0f} s")
+                print(f"{extractor:<22}  ✗ {record['status']}: {detail}")
+    return records
+
+
+def main():
+    """Main execution."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the schema extractors on synthetic schemas and flag regressions.")
+    parser.add_argument("--database-url", default=None,
+                        help="use this server instead of starting a throwaway PostgreSQL instance")
+    parser.add_argument("--pg-bin",
+                        help="directory with initdb and pg_ctl (default: from PATH or pg_config)")
+    parser.add_argument("--database", default="schema_benchmark",
+                        help="name prefix of the scratch databases, dropped and recreated (default: schema_benchmark)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help=f"comma-separated numbers of synthetic tables (default: {DEFAULT_SIZES})")
+    parser.add_argument("--extractors", default=",".join(EXTRACTORS),
+                        help=f"comma-separated extractors to run (default: {','.join(EXTRACTORS)})")
+    parser.add_argument("--timeout", type=float, default=600,
+                        help="seconds before an extractor run is killed and reported as a timeout (default: 600)")
+    parser.add_argument("--rest-latency-ms", type=float, default=0,
+                        help="latency the REST stand-in adds to each request (default: 0)")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE,
+                        help=f"JSON-lines file results are appended to (default: {DEFAULT_HISTORY_FILE})")
+    parser.add_argument("--regression-threshold", type=float, default=0.25,
+                        help="fraction by which time or memory may exceed the recent median (default: 0.25)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="also time full versus incremental extraction on each schema")
+    parser.add_argument("--changes", default="0,1,10,100",
+                        help="comma-separated numbers of tables to alter between incremental runs")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the scratch databases and dumps afterwards")
+    parser.add_argument("--run-extractor", choices=EXTRACTORS, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    parser.add_argument("--rest-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_extractor:
+        print(json.dumps(run_extractor(args.run_extractor, args.database_url, args.output, args.rest_url)))
+        return True
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    extractors = [name.strip() for name in args.extractors.split(",") if name.strip()]
+    unknown = sorted(set(extractors) - set(EXTRACTORS))
+    if unknown:
+        print(f"✗ Error: unknown extractor(s) {', '.join(unknown)}; choose from {', '.join(EXTRACTORS)}")
+        return False
+    changes = [int(count) for count in args.changes.split(",") if count.strip()]
+
+    with contextlib.ExitStack() as stack:
+        if args.database_url:
+            admin_url = args.database_url
+        else:
+            pg_bin = find_pg_bin(args.pg_bin)
+            if not pg_bin:
+                print("✗ Error: initdb not found; pass --pg-bin or --database-url")
+                return False
+            try:
+                admin_url = stack.enter_context(ThrowawayPostgres(pg_bin)).url
+            except RuntimeError as e:
+                print(f"✗ Could not start a throwaway PostgreSQL instance: {e}")
+                return False
+            print(f"✓ Started throwaway PostgreSQL instance with {pg_bin}")
+
+        output_dir = tempfile.mkdtemp(prefix="schema_benchmark_dumps_")
+        if not args.keep:
+            stack.callback(shutil.rmtree, output_dir, ignore_errors=True)
+
+        history = load_history(args.history)
+        run = {"timestamp": datetime.now().isoformat(), "revision": current_revision()}
+        records = []
+        success = True
+
+        for tables in sizes:
+            database = f"{args.database}_{tables}"
+            recreate_database(admin_url, database)
+            try:
+                records += [
+                    {**run, **record}
+                    for record in benchmark_size(admin_url, database, tables, extractors, output_dir,
+                                                 args.timeout, args.rest_latency_ms / 1000)
+                ]
+                if args.incremental:
+                    conn = psycopg2.connect(make_dsn(admin_url, dbname=database))
+                    try:
+                        success = run_benchmark(conn, tables, changes) and success
+                    finally:
+                        conn.close()
+            finally:
+                if not args.keep:
+                    recreate_database(admin_url, database, drop_only=True)
+
+        append_history(args.history, records)
+        print(f"\n✓ Appended {len(records)} results to {args.history}")
+        if args.keep:
+            print(f"✓ Dumps kept in {output_dir}")
+
+        regressed = False
+        for record in records:
+            if record['status'] != "ok":
+                success = False
+            for regression in find_regressions(record, history, args.regression_threshold):
+                print(f"⚠ Regression in {record['extractor']} at {record['tables']:,} tables: {regression}")
+                regressed = True
+        if not regressed:
+            print("✓ No regressions against the benchmark history")
+
+    return success and not regressed
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Catalog Record Model
+Compact records for the catalog rows a dump is rendered from (tables,
+columns, constraints, foreign keys, indexes, triggers, views, functions,
+sequences, policies), built straight from tuple cursor rows, plus the column
+type mapping shared by every extractor.
+"""
+
+import sys
+from typing import Any, Dict, Iterable, List
+
+
+class CatalogRecord:
+    """One catalog row: fixed __slots__, no per-row dict.
+
+    Positional fields follow the column order of the query a record is built
+    from. Values of the INTERNED fields (names, types, rules) are interned,
+    so the thousands of repeated identifiers of a large schema are stored
+    once. Records also answer record['field'] and record.get('field'), so
+    renderers work on them and on the plain dicts of a loaded snapshot alike.
+    """
+
+    __slots__ = ()
+    INTERNED = frozenset()
+
+    def __init__(self, *values):
+        if len(values) != len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes {len(self.__slots__)} fields, got {len(values)}")
+        interned = self.INTERNED
+        for field, value in zip(self.__slots__, values):
+            if field in interned and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, field, value)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple]) -> List['CatalogRecord']:
+        """Build one record per tuple row."""
+        return [cls(*row) for row in rows]
+
+    def __getitem__(self, field: str) -> Any:
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def get(self, field: str, default: Any = None) -> Any:
+        return getattr(self, field, default)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the record as a field -> value dict (nested records stay records)."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Column(CatalogRecord):
+    __slots__ = ('table_name', 'column_name', 'data_type', 'character_maximum_length', 'numeric_precision',
+                 'numeric_scale', 'is_nullable', 'column_default', 'ordinal_position', 'udt_name')
+    INTERNED = frozenset({'table_name', 'column_name', 'data_type', 'is_nullable', 'udt_name'})
+
+
+class Constraint(CatalogRecord):
+    """A primary key or unique constraint; columns is the comma-separated column list."""
+    __slots__ = ('table_name', 'constraint_name', 'columns')
+    INTERNED = frozenset({'table_name', 'constraint_name'})
+
+
+class ForeignKey(CatalogRecord):
+    """One column pair of a foreign key constraint."""
+    __slots__ = ('table_name', 'constraint_name', 'column_name', 'referenced_table', 'referenced_column',
+                 'delete_rule', 'update_rule')
+    INTERNED = frozenset(__slots__)
+
+
+class Index(CatalogRecord):
+    __slots__ = ('table_name', 'indexname', 'indexdef')
+    INTERNED = frozenset({'table_name', 'indexname'})
+
+
+class Trigger(CatalogRecord):
+    __slots__ = ('table_name', 'trigger_name', 'event_manipulation', 'action_timing', 'action_orientation',
+                 'action_statement')
+    INTERNED = frozenset({'table_name', 'trigger_name', 'event_manipulation', 'action_timing',
+                          'action_orientation'})
+
+
+class View(CatalogRecord):
+    __slots__ = ('table_name', 'view_definition')
+    INTERNED = frozenset({'table_name'})
+
+
+class Function(CatalogRecord):
+    """A function; definition is None for rows fetched as signatures only."""
+    __slots__ = ('function_name', 'arguments', 'definition')
+    INTERNED = frozenset({'function_name'})
+
+
+class Sequence(CatalogRecord):
+    __slots__ = ('sequence_name', 'data_type', 'start_value', 'minimum_value', 'maximum_value', 'increment',
+                 'cycle_option')
+    INTERNED = frozenset({'sequence_name', 'data_type', 'cycle_option'})
+
+
+class Policy(CatalogRecord):
+    __slots__ = ('table_name', 'policyname', 'permissive', 'roles', 'qual', 'with_check')
+    INTERNED = frozenset({'table_name', 'policyname', 'permissive'})
+
+
+class Table(CatalogRecord):
+    """Everything rendered for one table: its column, constraint, index and trigger records."""
+    __slots__ = ('name', 'columns', 'primary_key', 'unique_constraints', 'foreign_keys', 'indexes', 'triggers')
+    INTERNED = frozenset({'name'})
+
+
+def fetch_records(cursor, record: type, query: str, params: tuple = None) -> List[CatalogRecord]:
+    """Run a catalog query on a tuple cursor and build one `record` per row."""
+    cursor.execute(query, params)
+    return record.from_rows(cursor.fetchall())
+
+
+def quote_identifier(name: str) -> str:
+    """Return name as a quoted SQL identifier, as psycopg2's quote_ident does without needing a connection."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def column_type(column) -> str:
+    """Return the SQL type of an information_schema.columns row, as written in CREATE TABLE."""
+    data_type = column['data_type']
+    if data_type == 'character varying':
+        return f"VARCHAR({column['character_maximum_length'] or 255})"
+    if data_type == 'numeric':
+        # Unconstrained numeric has no precision; NUMERIC(p,s) would truncate its values.
+        if column['numeric_precision'] is None:
+            return "NUMERIC"
+        return f"NUMERIC({column['numeric_precision']},{column['numeric_scale']})"
+    if data_type == 'timestamp without time zone':
+        return "TIMESTAMP"
+    if data_type == 'timestamp with time zone':
+        return "TIMESTAMPTZ"
+    if data_type == 'ARRAY' and column.get('udt_name'):
+        # udt_name of an array type is its element type with a leading underscore
+        return f"{column['udt_name'][1:]}[]"
+    return data_type
+
+
+def column_definition(column) -> str:
+    """Render one column of a CREATE TABLE: name, type, NOT NULL and DEFAULT."""
+    definition = f"{column['column_name']} {column_type(column)}"
+    if column['is_nullable'] == 'NO':
+        definition += " NOT NULL"
+    if column['column_default']:
+        definition += f" DEFAULT {column['column_default']}"
+    return definition
+
+
+def merged_foreign_keys(foreign_keys: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Return constraint name -> foreign key, with the columns of multi-column keys joined.
+
+    The catalog queries return multi-column keys one row per column pair,
+    in column order.
+    """
+    constraints = {}
+    for fk in foreign_keys:
+        constraints.setdefault(fk['constraint_name'], []).append(fk)
+    return {
+        name: {
+            'constraint_name': name,
+            'column_name': ", ".join(pair['column_name'] for pair in pairs),
+            'referenced_table': pairs[0]['referenced_table'],
+            'referenced_column': ", ".join(pair['referenced_column'] for pair in pairs),
+            'delete_rule': pairs[0]['delete_rule'],
+            'update_rule': pairs[0]['update_rule'],
+        }
+        for name, pairs in constraints.items()
+    }
+
+
+def foreign_key_clause(fk) -> str:
+    """Render the FOREIGN KEY ... REFERENCES ... part of a foreign key constraint."""
+    clause = f"FOREIGN KEY ({fk['column_name']}) "
+    clause += f"REFERENCES {fk['referenced_table']} ({fk['referenced_column']})"
+    if fk['delete_rule'] != 'NO ACTION':
+        clause += f" ON DELETE {fk['delete_rule']}"
+    if fk['update_rule'] != 'NO ACTION':
+        clause += f" ON UPDATE {fk['update_rule']}"
+    return clause
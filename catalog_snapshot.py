@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Catalog Snapshot Store
+Persists the catalog rows gathered during an extraction as versioned, compact
+JSON files, so dumps and metadata can be re-rendered offline without a
+database connection.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+from catalog_model import CatalogRecord
+
+# Bump when the layout of the stored document changes incompatibly.
+# 2: rows follow catalog_model's field names (table_name throughout).
+SNAPSHOT_FORMAT_VERSION = 2
+DEFAULT_SNAPSHOT_DIR = "catalog_snapshots"
+
+
+def project_from_url(db_url: str) -> str:
+    """Derive a project key from a PostgreSQL connection URL."""
+    parsed = urlparse(db_url or "")
+    host = parsed.hostname or ""
+
+    # db.<project>.supabase.co
+    if host.startswith("db.") and host.endswith(".supabase.co"):
+        return host.split(".")[1]
+
+    # Pooler URLs carry the project in the user name: postgres.<project>
+    user = parsed.username or ""
+    if "." in user:
+        return user.split(".", 1)[1]
+
+    return host.replace(".", "_") or "local"
+
+
+def _jsonable(value: Any) -> Any:
+    """json.dump fallback: catalog records as dicts, anything else (dates, Decimals) as text."""
+    if isinstance(value, CatalogRecord):
+        return value.as_dict()
+    return str(value)
+
+
+def save_snapshot(catalog: Dict[str, Any], project: str, source: str,
+                  directory: str = DEFAULT_SNAPSHOT_DIR) -> Path:
+    """Write a catalog snapshot and return its path.
+
+    Files are named <project>_<source>_<timestamp>.json so snapshots of the
+    same project sort chronologically.
+    """
+    created = datetime.now()
+    path = Path(directory) / f"{project}_{source}_{created.strftime('%Y%m%dT%H%M%S')}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    document = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "project": project,
+        "source": source,
+        "created": created.isoformat(),
+        "catalog": catalog,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, separators=(',', ':'), default=_jsonable)
+
+    return path
+
+
+def load_snapshot(path: str, source: str = None) -> Dict[str, Any]:
+    """Load a catalog snapshot, checking its format version and source extractor."""
+    with open(path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+
+    version = document.get("format_version")
+    if version != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {version} in {path} "
+                         f"(expected {SNAPSHOT_FORMAT_VERSION})")
+    if source and document.get("source") != source:
+        raise ValueError(f"Snapshot {path} was written by '{document.get('source')}', "
+                         f"not '{source}'")
+
+    return document
+
+
+def latest_snapshot(project: str, source: str,
+                    directory: str = DEFAULT_SNAPSHOT_DIR) -> Optional[Path]:
+    """Return the most recent snapshot for a project and extractor, if any."""
+    candidates = sorted(Path(directory).glob(f"{project}_{source}_*.json"))
+    return candidates[-1] if candidates else None
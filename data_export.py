@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Table Data Exporter
+Streams table contents out of PostgreSQL with COPY ... TO STDOUT into one file
+per table. Several tables are exported concurrently, each on its own
+connection, and all of them read the same exported snapshot so the files are
+consistent with each other (the approach pg_dump -j uses).
+"""
+
+import json
+import time
+import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from dump_writer import DEFAULT_BUFFER_SIZE, DEFAULT_COMPRESSION_LEVEL, compressed_name, open_compressed
+
+DATA_FILE_SUFFIX = ".copy"
+MANIFEST_FILE = "manifest.json"
+# Timings and the snapshot id of the last export; kept out of the manifest so
+# that re-exporting unchanged tables rewrites it byte for byte.
+RUN_FILE = "run.json"
+DEFAULT_DATA_WORKERS = 4
+DEFAULT_SCHEMA = "public"
+
+
+def data_file_name(table_name: str, compression: Optional[str] = None) -> str:
+    """Return the file name a table's data is exported to (with .gz or .xz if compressed)."""
+    return compressed_name(f"{table_name}{DATA_FILE_SUFFIX}", compression)
+
+
+def export_table(conn, table_name: str, directory: str, snapshot_id: Optional[str] = None,
+                 schema: str = DEFAULT_SCHEMA, compression: Optional[str] = None,
+                 level: int = DEFAULT_COMPRESSION_LEVEL) -> Dict[str, Any]:
+    """Stream one table of `schema` into <directory>/<table>.copy and return its manifest entry.
+
+    Rows go straight from the COPY stream to the file through a fixed-size
+    buffer, so memory use does not depend on the size of the table. With
+    `compression` the file is gzip or xz, compressed on its own thread while
+    the next rows arrive from the server.
+    """
+    path = Path(directory) / data_file_name(table_name, compression)
+    started = time.perf_counter()
+
+    try:
+        with conn.cursor() as cursor:
+            if snapshot_id:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+
+            copy = sql.SQL("COPY {} TO STDOUT").format(sql.Identifier(schema, table_name))
+            with open_compressed(str(path), compression, level, DEFAULT_BUFFER_SIZE) as f:
+                cursor.copy_expert(copy, f)
+            rows = cursor.rowcount
+    finally:
+        conn.rollback()
+
+    return {
+        "table": table_name,
+        "file": path.name,
+        "rows": rows,
+        "bytes": path.stat().st_size,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _export_with_pool(pool, table_name: str, directory: str, snapshot_id: Optional[str],
+                      schema: str, compression: Optional[str], level: int) -> Dict[str, Any]:
+    """Export one table on a connection borrowed from the pool."""
+    conn = pool.getconn()
+    try:
+        return export_table(conn, table_name, directory, snapshot_id, schema, compression, level)
+    finally:
+        pool.putconn(conn)
+
+
+def _largest_first(cursor, tables: List[str], schema: str) -> List[str]:
+    """Order tables by on-disk size, largest first, so the slowest export starts earliest."""
+    cursor.execute("""
+    SELECT c.relname, pg_total_relation_size(c.oid) AS size
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s AND c.relname = ANY(%s)
+    """, (schema, tables))
+    sizes = dict(cursor.fetchall())
+    return sorted(tables, key=lambda table: sizes.get(table, 0), reverse=True)
+
+
+def export_tables(db_url: str, tables: List[str], directory: str,
+                  workers: int = DEFAULT_DATA_WORKERS, schema: str = DEFAULT_SCHEMA,
+                  compression: Optional[str] = None, level: int = DEFAULT_COMPRESSION_LEVEL) -> Dict[str, Any]:
+    """Export every table of `schema` concurrently and write the manifest and run record; return the manifest.
+
+    A leader connection holds a REPEATABLE READ transaction open and exports
+    its snapshot; each worker adopts it before copying, so all files reflect
+    the same point in time.
+    """
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+
+    leader = psycopg2.connect(db_url)
+    pool = None
+    try:
+        leader.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        with leader.cursor() as cursor:
+            schedule = _largest_first(cursor, tables, schema)
+            try:
+                cursor.execute("SELECT pg_export_snapshot()")
+                snapshot_id = cursor.fetchone()[0]
+            except psycopg2.Error as e:
+                print(f"⚠ Could not export a snapshot, tables are read independently: {e}")
+                leader.rollback()
+                snapshot_id = None
+
+        pool = ThreadedConnectionPool(1, max(workers, 1), db_url)
+        entries = {}
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            futures = [
+                executor.submit(_export_with_pool, pool, table, directory, snapshot_id, schema, compression, level)
+                for table in schedule
+            ]
+            for future in as_completed(futures):
+                entry = future.result()
+                entries[entry['table']] = entry
+                print(f"    • {entry['table']}: {entry['rows']:,} rows, "
+                      f"{entry['bytes'] / 1024 / 1024:.1f} MB in {entry['seconds']:.2f} s")
+        encoding = leader.encoding
+    finally:
+        if pool:
+            pool.closeall()
+        leader.close()
+
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(entry['bytes'] for entry in entries.values())
+    manifest = {
+        "format": "text",
+        "compression": compression,
+        "encoding": encoding,
+        "tables": [{key: value for key, value in entries[table].items() if key != "seconds"} for table in tables],
+    }
+    run = {
+        "generated": datetime.now().isoformat(),
+        "snapshot": snapshot_id,
+        "seconds": round(elapsed, 3),
+        "tables": {table: entries[table]['seconds'] for table in tables},
+    }
+    with open(Path(directory) / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    with open(Path(directory) / RUN_FILE, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+
+    print(f"✓ Exported {len(tables)} tables ({total_bytes / 1024 / 1024:.1f} MB) "
+          f"to {directory}/ in {elapsed:.2f} s with {workers} workers")
+    return manifest
@@ -2,12 +2,91 @@
 """
 Supabase Schema Extraction - Diagnostics & Validation Tool
 Tests connection, validates credentials, and checks database status.
+Profiles the network path to the database (connection setup, query round
+trips, bulk throughput) and recommends extractor settings for it.
 """
 
 import os
+import re
+import ssl
+import json
+import math
+import time
+import socket
+import struct
+import statistics
 import psycopg2
+from psycopg2.extensions import parse_dsn
+from psycopg2.pool import SimpleConnectionPool
 from pathlib import Path
 from datetime import datetime
+from dump_writer import COMPRESSION_SUFFIXES, dump_compression, open_dump
+from sql_splitter import DEFAULT_BLOCK_SIZE, Tokenizer
+
+DEFAULT_PINGS = 50
+DEFAULT_COPY_ROWS = 200000
+# PostgreSQL SSLRequest: message length 8, then the request code 80877103.
+SSL_REQUEST = struct.pack("!ii", 8, 80877103)
+# Catalog queries the direct extractor runs per table (columns, primary key,
+# unique constraints, foreign keys, indexes, triggers).
+QUERIES_PER_TABLE = 6
+# Catalog round trips of a bulk Supabase extraction, whatever the table count.
+BULK_ROUND_TRIPS = 12
+MAX_RECOMMENDED_WORKERS = 8
+# Assumed size of a function definition when the schema has none to measure.
+DEFAULT_DEFINITION_BYTES = 2048
+METADATA_FILE = "supabase_schema_metadata.json"
+
+# One alternation finds, in file order, what the validator counts and the
+# start of text whose contents are never counted. Statements count at the
+# start of a line: their lookbehinds let only a newline or a blank through,
+# and blanks are followed back to the newline by the scan. String literals,
+# quoted identifiers and -- comments that end on their line are matched
+# whole; the rest of quoted text (E'...' strings, dollar-quoted bodies,
+# /* */ comments, ...) is skipped as the SQL splitter skips it. Every
+# alternative starts with one literal character (not a class or a group),
+# which keeps re's fast scan for the characters a match can start with.
+DUMP_TOKENS = re.compile(rb"""
+    CREATE(?<![^\n \t]CREATE)[ \t]+(?:OR[ \t]+REPLACE[ \t]+)?(?:UNIQUE[ \t]+)?
+    (?P<create>TABLE|VIEW|MATERIALIZED[ \t]+VIEW|FUNCTION|INDEX|POLICY|SEQUENCE|TRIGGER)
+    (?:[ \t]+IF[ \t]+NOT[ \t]+EXISTS)?[ \t]+(?P<name>[^\s(]+)
+  | COPY(?<![^\n \t]COPY)[ \t][^\n]*FROM[ \t]+(?P<copy>stdin);[ \t]*(?=\r?\n|\Z)
+  | INSERT(?<![^\n \t]INSERT)[ \t]+(?P<insert>INTO)\b
+  | PRIMARY[ \t]+(?P<primary>KEY)
+  | FOREIGN[ \t]+(?P<foreign>KEY)
+  | '(?<![Ee]')[^'\n]*'
+  | "[^"\n]*"
+  | --[^\n]*
+  | '(?P<string>)
+  | "(?P<identifier>)
+  | \$(?P<dollar>)
+  | /\*(?P<comment>)
+""", re.X)
+# Matches that count only at the start of a line.
+_STATEMENT_TOKENS = ('name', 'copy', 'insert')
+
+# (object class, label) in report order; the first eight are always reported.
+DUMP_CHECKS = [
+    ('TABLE', 'Tables'),
+    ('PRIMARY KEY', 'Primary keys'),
+    ('FOREIGN KEY', 'Foreign keys'),
+    ('INDEX', 'Indexes'),
+    ('VIEW', 'Views'),
+    ('FUNCTION', 'Functions'),
+    ('POLICY', 'RLS policies'),
+    ('SEQUENCE', 'Sequences'),
+    ('MATERIALIZED VIEW', 'Materialized views'),
+    ('TRIGGER', 'Triggers'),
+    ('COPY', 'COPY data blocks'),
+    ('INSERT', 'INSERT statements'),
+]
+# Metadata lists cross-checked against the names of the dump's CREATE
+# statements, with the dump section those statements are written in.
+METADATA_CHECKS = [
+    ('tables', 'TABLE', 'Tables', 'pre-data'),
+    ('views', 'VIEW', 'Views', 'pre-data'),
+    ('functions', 'FUNCTION', 'Functions', 'pre-data'),
+]
 
 def load_env():
     """Load environment from .env.local"""
@@ -23,10 +102,16 @@ def load_env():
     
     return env_vars
 
-def test_connection(db_url):
-    """Test database connection."""
+def open_pool(db_url):
+    """Open a one-connection pool for every probe; return (pool, seconds to connect)."""
+    started = time.perf_counter()
+    pool = SimpleConnectionPool(1, 1, db_url)
+    return pool, time.perf_counter() - started
+
+def test_connection(pool):
+    """Test database connection through the pooled connection."""
+    conn = pool.getconn()
     try:
-        conn = psycopg2.connect(db_url)
         cursor = conn.cursor()
         
         # Test query
@@ -34,11 +119,226 @@ def test_connection(db_url):
         version = cursor.fetchone()
         
         cursor.close()
-        conn.close()
+        conn.rollback()
         
         return True, version[0] if version else "Connected"
     except Exception as e:
         return False, str(e)
+    finally:
+        pool.putconn(conn)
+
+def _endpoint(db_url):
+    """Return (host, port, sslmode) of a connection string; host is None for a unix socket."""
+    params = parse_dsn(db_url)
+    host = (params.get('host') or params.get('hostaddr') or '').split(',')[0]
+    port = int((params.get('port') or '5432').split(',')[0])
+    if not host or host.startswith('/'):
+        host = None
+    return host, port, params.get('sslmode', 'prefer')
+
+def time_transport(host, port, sslmode, timeout=10):
+    """Time DNS lookup, TCP connect and TLS handshake on a throwaway socket.
+    
+    The TLS time includes PostgreSQL's SSLRequest round trip, as libpq
+    makes it before every handshake. Steps that do not apply are None.
+    """
+    timings = {'dns': None, 'tcp': None, 'tls': None, 'tls_offered': None}
+    
+    started = time.perf_counter()
+    family, kind, proto, _, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    timings['dns'] = time.perf_counter() - started
+    
+    sock = socket.socket(family, kind, proto)
+    sock.settimeout(timeout)
+    try:
+        started = time.perf_counter()
+        sock.connect(address)
+        timings['tcp'] = time.perf_counter() - started
+        
+        if sslmode != 'disable':
+            started = time.perf_counter()
+            sock.sendall(SSL_REQUEST)
+            timings['tls_offered'] = sock.recv(1) == b'S'
+            if timings['tls_offered']:
+                # Only the handshake is timed here; libpq verifies certificates as sslmode asks.
+                context = ssl.create_default_context()
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+                context.wrap_socket(sock, server_hostname=host).close()
+                timings['tls'] = time.perf_counter() - started
+    finally:
+        sock.close()
+    
+    return timings
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of an ascending list."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+class _ByteCounter:
+    """File-like COPY destination that only counts what it receives."""
+    
+    def __init__(self):
+        self.bytes = 0
+    
+    def write(self, data):
+        self.bytes += len(data)
+
+def profile_queries(pool, pings=DEFAULT_PINGS, copy_rows=DEFAULT_COPY_ROWS):
+    """Measure query round trips, catalog query time and COPY throughput on the pooled connection."""
+    conn = pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            
+            rtts = []
+            for _ in range(pings):
+                started = time.perf_counter()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+                rtts.append(time.perf_counter() - started)
+            rtts.sort()
+            
+            cursor.execute("""
+            SELECT count(*), min(table_name) FROM information_schema.tables
+            WHERE table_schema = 'public' AND table_type = 'BASE TABLE'
+            """)
+            tables, sample_table = cursor.fetchone()
+            cursor.execute("""
+            SELECT count(*), coalesce(avg(length(pg_get_functiondef(p.oid))), 0)
+            FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace
+            WHERE n.nspname = 'public' AND p.prokind <> 'a'
+            """)
+            functions, definition_bytes = cursor.fetchone()
+            
+            # The shape of the extractors' per-table columns query, for a
+            # round trip that includes real catalog work on the server.
+            catalog_times = []
+            for _ in range(5):
+                started = time.perf_counter()
+                cursor.execute("""
+                SELECT c.column_name, c.data_type, c.is_nullable, c.column_default
+                FROM information_schema.columns c
+                WHERE c.table_schema = 'public' AND c.table_name = %s
+                ORDER BY c.ordinal_position
+                """, (sample_table or '',))
+                cursor.fetchall()
+                catalog_times.append(time.perf_counter() - started)
+            
+            sink = _ByteCounter()
+            started = time.perf_counter()
+            cursor.copy_expert(
+                f"COPY (SELECT g, md5(g::text) FROM generate_series(1, {int(copy_rows)}) g) TO STDOUT", sink)
+            copy_seconds = time.perf_counter() - started
+        conn.rollback()
+    finally:
+        pool.putconn(conn)
+    
+    return {
+        'pings': len(rtts),
+        'rtt_p50': _percentile(rtts, 0.50),
+        'rtt_p90': _percentile(rtts, 0.90),
+        'rtt_p99': _percentile(rtts, 0.99),
+        'rtt_max': rtts[-1],
+        'catalog_query': statistics.median(catalog_times),
+        'copy_bytes': sink.bytes,
+        'copy_seconds': copy_seconds,
+        'throughput': sink.bytes / copy_seconds if copy_seconds > 0 else 0.0,
+        'tables': tables,
+        'functions': functions,
+        'definition_bytes': float(definition_bytes) or DEFAULT_DEFINITION_BYTES,
+    }
+
+def recommend(profile, connect_seconds):
+    """Turn a network profile into extractor settings, as (setting, reason) pairs."""
+    rtt = profile['rtt_p50']
+    # Server-side time of a catalog query: what remains of its round trip without the network.
+    service = max(profile['catalog_query'] - rtt, 0.0005)
+    queries = profile['tables'] * QUERIES_PER_TABLE
+    serial = queries * (rtt + service)
+    
+    recommendations = []
+    
+    # Workers hide network latency until the server itself is the bottleneck:
+    # while one query is served, rtt / service others can be on the wire.
+    workers = min(MAX_RECOMMENDED_WORKERS, 1 + int(rtt / service))
+    if workers > 1 and serial < 2 * workers * connect_seconds:
+        workers = 1
+    parallel = max(serial / workers, queries * service)
+    if workers > 1:
+        recommendations.append((f"extract_schema_direct.py --workers {workers}",
+                                f"~{serial:.1f} s of per-table catalog queries one at a time, "
+                                f"~{parallel:.1f} s spread over {workers} connections"))
+    else:
+        recommendations.append(("extract_schema_direct.py --workers 1",
+                                f"the server, not the network, bounds catalog queries "
+                                f"(~{service * 1000:.1f} ms of server time per {rtt * 1000:.1f} ms round trip)"
+                                if profile['tables'] else "no tables to fetch concurrently"))
+    
+    saved = (queries - BULK_ROUND_TRIPS) * rtt
+    if saved > 0.5:
+        recommendations.append(("extract_supabase_schema.py --bulk",
+                                f"{BULK_ROUND_TRIPS} catalog round trips instead of ~{queries:,}, "
+                                f"~{saved:.1f} s less network wait"))
+    
+    # When streaming definitions, batches of at least four bandwidth-delay
+    # products keep the round trips under a fifth of the streaming time.
+    bdp = profile['throughput'] * rtt
+    itersize = min(5000, max(100, math.ceil(4 * bdp / profile['definition_bytes'])))
+    if profile['functions'] > itersize:
+        recommendations.append((f"extract_supabase_schema.py --itersize {itersize} (if streaming)",
+                                f"{profile['functions']:,} function definitions of "
+                                f"~{profile['definition_bytes'] / 1024:.1f} KB at "
+                                f"{profile['throughput'] / 1024 / 1024:.1f} MB/s and "
+                                f"{rtt * 1000:.1f} ms round trips"))
+    
+    if profile['rtt_p99'] > 3 * profile['rtt_p50'] and profile['rtt_p99'] > 0.005:
+        recommendations.append(("check the network path",
+                                f"p99 round trip is {profile['rtt_p99'] / profile['rtt_p50']:.0f}x the median; "
+                                f"timings of single runs will vary"))
+    return recommendations
+
+def print_network_profile(pool, db_url, connect_seconds, pings=DEFAULT_PINGS, copy_rows=DEFAULT_COPY_ROWS):
+    """Print the network profile of the pooled connection and the settings it suggests."""
+    def ms(seconds):
+        return f"{seconds * 1000:.2f} ms"
+    
+    host, port, sslmode = _endpoint(db_url)
+    transport = {'dns': None, 'tcp': None, 'tls': None, 'tls_offered': None}
+    if host:
+        try:
+            transport = time_transport(host, port, sslmode)
+        except (OSError, ssl.SSLError) as e:
+            print(f"   ⚠ Transport probe failed: {e}")
+    
+    print(f"   Endpoint: {f'{host}:{port}' if host else 'unix socket'} (sslmode={sslmode})")
+    if host:
+        print(f"   DNS lookup:                {ms(transport['dns']) if transport['dns'] is not None else 'n/a'}")
+        print(f"   TCP connect:               {ms(transport['tcp']) if transport['tcp'] is not None else 'n/a'}")
+        if transport['tls'] is not None:
+            print(f"   TLS handshake:             {ms(transport['tls'])}")
+        elif transport['tls_offered'] is False:
+            print(f"   TLS handshake:             not offered by the server")
+        else:
+            print(f"   TLS handshake:             n/a (sslmode={sslmode})")
+    setup = sum(transport[step] or 0.0 for step in ('dns', 'tcp', 'tls'))
+    print(f"   Authentication + startup:  {ms(max(connect_seconds - setup, 0.0))}")
+    print(f"   Connection total:          {ms(connect_seconds)}")
+    
+    profile = profile_queries(pool, pings, copy_rows)
+    print(f"   Query round trip ({profile['pings']} pings): p50 {ms(profile['rtt_p50'])}, "
+          f"p90 {ms(profile['rtt_p90'])}, p99 {ms(profile['rtt_p99'])}, max {ms(profile['rtt_max'])}")
+    print(f"   Catalog query:             {ms(profile['catalog_query'])}")
+    print(f"   COPY throughput:           {profile['throughput'] / 1024 / 1024:.1f} MB/s "
+          f"({profile['copy_bytes'] / 1024 / 1024:.1f} MB in {profile['copy_seconds']:.2f} s)")
+    
+    print()
+    print("   Recommended settings:")
+    for setting, reason in recommend(profile, connect_seconds):
+        print(f"   → {setting}")
+        print(f"     {reason}")
+    return profile
 
 def diagnose():
     """Run diagnostic tests."""
@@ -122,6 +422,7 @@ def diagnose():
     
     env_vars = load_env()
     db_url = env_vars.get('DATABASE_URL')
+    pool, success = None, False
     
     if not db_url:
         print(f"   ⚠ No DATABASE_URL configured")
@@ -130,7 +431,11 @@ def diagnose():
         print(f"     2. Then run this script again")
     else:
         print(f"   Attempting connection to: {db_url[:50]}...")
-        success, result = test_connection(db_url)
+        try:
+            pool, connect_seconds = open_pool(db_url)
+            success, result = test_connection(pool)
+        except psycopg2.Error as e:
+            pool, success, result = None, False, str(e).strip()
         
         if success:
             print(f"   ✓ Connection successful!")
@@ -145,8 +450,22 @@ def diagnose():
     
     print()
     
-    # 5. Check extraction scripts
-    print("5. EXTRACTION SCRIPTS")
+    # 5. Profile the network path, on the same pooled connection
+    print("5. NETWORK PROFILE")
+    print("-" * 70)
+    
+    if pool and success:
+        try:
+            print_network_profile(pool, db_url, connect_seconds)
+        except psycopg2.Error as e:
+            print(f"   ✗ Profiling failed: {str(e).strip()}")
+    else:
+        print(f"   ⚠ Skipped: no database connection")
+    
+    print()
+    
+    # 6. Check extraction scripts
+    print("6. EXTRACTION SCRIPTS")
     print("-" * 70)
     
     scripts = [
@@ -166,8 +485,8 @@ def diagnose():
     
     print()
     
-    # 6. Check documentation
-    print("6. DOCUMENTATION")
+    # 7. Check documentation
+    print("7. DOCUMENTATION")
     print("-" * 70)
     
     docs = [
@@ -186,7 +505,7 @@ def diagnose():
     
     print()
     
-    # 7. Summary
+    # 8. Summary
     print("=" * 70)
     print("SUMMARY")
     print("=" * 70)
@@ -198,7 +517,6 @@ def diagnose():
         print()
     
     if db_url:
-        success, _ = test_connection(db_url)
         if success:
             print("✓ Ready to extract schema!")
             print("  Run: python extract_schema_direct.py")
@@ -210,9 +528,113 @@ def diagnose():
         print("  Run: python setup_supabase_connection.py")
     
     print()
+    
+    if pool:
+        pool.closeall()
 
-def validate_dump(file_path='SUPABASE_COMPLETE_SCHEMA_DUMP.sql'):
-    """Validate an existing dump file."""
+def _object_name(name):
+    """Bare object name of a CREATE statement: schema qualifier and quotes dropped."""
+    return name.rsplit(b'.', 1)[-1].strip(b'"').decode('utf-8', 'replace')
+
+class _DumpScan(Tokenizer):
+    """One counting pass over a dump stream, on the SQL splitter's tokenizer.
+    
+    DUMP_TOKENS runs over the buffer up to its last whole line; quoted text,
+    comments and COPY data are skipped with the tokenizer's own methods, so
+    they end where they end when the dump is split or restored. The buffer
+    holds about a block, or one quoted body or comment if that is longer.
+    """
+    
+    def __init__(self, f):
+        super().__init__(f, DEFAULT_BLOCK_SIZE)
+        self.counts = dict.fromkeys((kind for kind, _ in DUMP_CHECKS), 0)
+        self.names = {kind: set() for _, kind, _, _ in METADATA_CHECKS}
+        self.data_bytes = 0
+    
+    def _lines_end(self, i):
+        """Index of the buffer's last newline after i, reading on until there is one; its length at end of file."""
+        while True:
+            end = self.buf.rfind(b"\n", i + 1)
+            if end >= 0:
+                return end
+            if not self._fill():
+                return len(self.buf)
+    
+    def _at_line_start(self, i):
+        """Whether only blanks precede buf[i] on its line."""
+        line = self.buf.rfind(b"\n", 0, i) + 1
+        return not self.buf[line:i].strip(b" \t")
+    
+    def _skip(self, match):
+        """Index just past the COPY data, quoted text or comment that match starts."""
+        j = match.start()
+        if match.lastgroup == 'copy':
+            self.counts['COPY'] += 1
+            data = self._skip_line(match.end())
+            data_start = self.base + data
+            data_end, end = self._copy_data_end(data)
+            self.data_bytes += self.base + data_end - data_start
+            return end
+        if match.lastgroup == 'string':
+            return self._skip_string(j)
+        if match.lastgroup == 'identifier':
+            return self._skip_quoted(j, b'"')
+        if match.lastgroup == 'dollar':
+            return self._skip_dollar_quote(j)
+        return self._skip_block_comment(j)
+    
+    def scan(self):
+        """Count the objects of the whole stream; returns the number of bytes read."""
+        i = 0
+        while True:
+            end = self._lines_end(i)
+            for match in DUMP_TOKENS.finditer(self.buf, i, end):
+                kind = match.lastgroup
+                if kind is None:
+                    # A string, quoted identifier or comment ending on its line, matched whole.
+                    continue
+                if kind in _STATEMENT_TOKENS and not self._at_line_start(match.start()):
+                    continue
+                if kind == 'name':
+                    create = b' '.join(match.group('create').split()).decode()
+                    self.counts[create] += 1
+                    if create in self.names:
+                        self.names[create].add(_object_name(match.group('name')))
+                elif kind == 'insert':
+                    self.counts['INSERT'] += 1
+                elif kind in ('primary', 'foreign'):
+                    self.counts[kind.upper() + ' KEY'] += 1
+                else:
+                    # Skipped once the iteration is over, as skipping may read on into the buffer.
+                    break
+            else:
+                if end == len(self.buf):
+                    return self.base + end
+                # A newline, so the lookbehinds of the next line's statements still see it.
+                i = self._drop(end)
+                continue
+            i = self._skip(match)
+
+def scan_dump(file_path):
+    """Count the dump's objects in one pass over it, read as a stream.
+    
+    Returns ({object class: count}, {object class: set of names}, data bytes,
+    bytes scanned).
+    Only one block (or one quoted body) is held at a time, so memory use
+    stays flat whatever the file size; a gzip or xz dump is decompressed on
+    the fly, never written out.
+    """
+    with open_dump(str(file_path)) as f:
+        scan = _DumpScan(f)
+        scanned = scan.scan()
+    return scan.counts, scan.names, scan.data_bytes, scanned
+
+def validate_dump(file_path='SUPABASE_COMPLETE_SCHEMA_DUMP.sql', metadata_path=None):
+    """Validate an existing dump file, cross-checked against the extraction metadata.
+    
+    The metadata is <dump>.json (as extract_projects.py writes it) or
+    supabase_schema_metadata.json next to the dump, unless given.
+    """
     
     print("\n" + "=" * 70)
     print("SCHEMA DUMP VALIDATION")
@@ -229,47 +651,97 @@ def validate_dump(file_path='SUPABASE_COMPLETE_SCHEMA_DUMP.sql'):
     size_mb = file_path.stat().st_size / (1024 * 1024)
     print(f"Size: {size_mb:.2f} MB")
     print(f"Created: {datetime.fromtimestamp(file_path.stat().st_mtime)}")
-    print()
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Check for key elements
-    checks = [
-        ('CREATE TABLE', 'Tables'),
-        ('PRIMARY KEY', 'Primary keys'),
-        ('FOREIGN KEY', 'Foreign keys'),
-        ('CREATE INDEX', 'Indexes'),
-        ('CREATE VIEW', 'Views'),
-        ('CREATE FUNCTION', 'Functions'),
-        ('CREATE POLICY', 'RLS policies'),
-        ('CREATE SEQUENCE', 'Sequences'),
-    ]
+    started = time.perf_counter()
+    counts, names, data_bytes, scanned = scan_dump(file_path)
+    elapsed = time.perf_counter() - started
+    scanned_mb = scanned / (1024 * 1024)
+    compression = dump_compression(file_path)
+    if compression:
+        print(f"Compression: {compression} ({scanned_mb:.2f} MB uncompressed, "
+              f"ratio {scanned_mb / max(size_mb, 1e-9):.1f}x)")
+    print()
     
     print("SCHEMA ELEMENTS:")
     print("-" * 70)
     
-    for pattern, name in checks:
-        count = content.count(pattern)
+    for index, (kind, name) in enumerate(DUMP_CHECKS):
+        count = counts[kind]
         if count > 0:
             print(f"✓ {name}: {count}")
-        else:
+        elif index < 8:
             print(f"⚠ {name}: 0 (none found)")
-    
+    if counts['COPY']:
+        print(f"✓ Table data: {data_bytes / (1024 * 1024):.2f} MB")
+    print(f"  (scanned in {elapsed:.2f} s, {scanned_mb / max(elapsed, 1e-6):.0f} MB/s)")
     print()
-    print("✓ Dump file is valid")
     
-    return True
+    if metadata_path is None:
+        # dump.sql.gz's metadata is dump.json, as for dump.sql.
+        base = file_path.with_suffix('') if file_path.suffix in COMPRESSION_SUFFIXES.values() else file_path
+        candidates = [base.with_suffix('.json'), file_path.parent / METADATA_FILE]
+        metadata_path = next((path for path in candidates if path.exists()), None)
+    
+    valid = True
+    if metadata_path is None:
+        print(f"⚠ No {METADATA_FILE} next to the dump; objects not cross-checked")
+    else:
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"✗ Cannot read metadata {metadata_path}: {e}")
+            return False
+        
+        print(f"METADATA CROSS-CHECK ({metadata_path}):")
+        print("-" * 70)
+        # A dump written with --section only holds the objects of those sections.
+        sections = metadata.get("sections")
+        for key, kind, name, section in METADATA_CHECKS:
+            if sections is not None and section not in sections:
+                print(f"  {name}: not checked, the dump has no {section} section ({', '.join(sections)} only)")
+                continue
+            expected = {entry['name'] if isinstance(entry, dict) else entry for entry in metadata.get(key, [])}
+            missing = sorted(expected - names[kind])
+            extra = sorted(names[kind] - expected)
+            if missing:
+                valid = False
+                print(f"✗ {name}: {len(missing)} of {len(expected)} missing from the dump: {', '.join(missing[:10])}"
+                      + (" ..." if len(missing) > 10 else ""))
+            else:
+                print(f"✓ {name}: all {len(expected)} present")
+            if extra:
+                print(f"⚠ {name}: {len(extra)} in the dump but not in the metadata: {', '.join(extra[:10])}"
+                      + (" ..." if len(extra) > 10 else ""))
+        print()
+    
+    if valid:
+        print("✓ Dump file is valid")
+    else:
+        print("✗ Dump file is incomplete")
+    
+    return valid
 
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == 'validate':
-        # Validate existing dump
-        if len(sys.argv) > 2:
-            validate_dump(sys.argv[2])
-        else:
-            validate_dump()
+        # Validate existing dump: validate [dump] [metadata]
+        valid = validate_dump(*sys.argv[2:4])
+        exit(0 if valid else 1)
+    elif len(sys.argv) > 1 and sys.argv[1] == 'network':
+        # Profile the network path only: network [pings] [copy rows]
+        db_url = os.getenv('DATABASE_URL') or load_env().get('DATABASE_URL')
+        if not db_url:
+            print("✗ No DATABASE_URL configured")
+            exit(1)
+        pool, connect_seconds = open_pool(db_url)
+        try:
+            print_network_profile(pool, db_url, connect_seconds,
+                                  int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PINGS,
+                                  int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_COPY_ROWS)
+        finally:
+            pool.closeall()
     else:
         # Run diagnostics
         diagnose()
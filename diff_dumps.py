@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Schema Dump Diff
+Compares two directory-format dumps object by object. The manifests are
+compared first: objects whose SHA-256 is the same in both are skipped
+without being read, so only the files of added, removed and changed objects
+are opened, and changed ones are shown as unified diffs.
+"""
+
+import sys
+import difflib
+import argparse
+from typing import Any, Dict, Iterable, List
+from dump_directory import TOC_FILE, is_directory_dump, read_object, read_toc
+
+
+def compare_tocs(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Return the ids of the objects added, removed and changed between two manifests, in restore order."""
+    old_hashes = {entry['id']: entry['sha256'] for entry in old['objects']}
+    new_hashes = {entry['id']: entry['sha256'] for entry in new['objects']}
+    return {
+        'added': [entry['id'] for entry in new['objects'] if entry['id'] not in old_hashes],
+        'removed': [entry['id'] for entry in old['objects'] if entry['id'] not in new_hashes],
+        'changed': [entry['id'] for entry in new['objects']
+                    if entry['id'] in old_hashes and old_hashes[entry['id']] != new_hashes[entry['id']]],
+    }
+
+
+def _lines(directory: str, toc: Dict[str, Any], object_id: str) -> List[str]:
+    entry = next(entry for entry in toc['objects'] if entry['id'] == object_id)
+    return read_object(directory, entry).decode('utf-8').splitlines(keepends=True)
+
+
+def diff_dumps(old_dir: str, new_dir: str, objects: Iterable[str] = None, stat: bool = False) -> bool:
+    """Print the differences between two directory dumps; return True if they have none.
+
+    `objects` restricts the comparison to those objects (ids or names, as
+    for restore_schema --object), without their dependencies.
+    """
+    old, new = read_toc(old_dir), read_toc(new_dir)
+    if objects:
+        objects = list(objects)
+        wanted = {entry['id'] for toc in (old, new) for entry in toc['objects']
+                  if any(name in (entry['id'], entry['name']) for name in objects)}
+        if not wanted:
+            raise ValueError(f"No object {', '.join(objects)} in either dump")
+        old = dict(old, objects=[entry for entry in old['objects'] if entry['id'] in wanted])
+        new = dict(new, objects=[entry for entry in new['objects'] if entry['id'] in wanted])
+
+    changes = compare_tocs(old, new)
+    read = 0
+    for object_id in changes['removed']:
+        print(f"- {object_id}")
+    for object_id in changes['added']:
+        print(f"+ {object_id}")
+    for object_id in changes['changed']:
+        print(f"~ {object_id}")
+        if stat:
+            continue
+        read += 2
+        sys.stdout.writelines(difflib.unified_diff(
+            _lines(old_dir, old, object_id), _lines(new_dir, new, object_id),
+            f"{old_dir}/{object_id}", f"{new_dir}/{object_id}"))
+
+    total = len(changes['added']) + len(changes['removed']) + len(changes['changed'])
+    compared = len({entry['id'] for toc in (old, new) for entry in toc['objects']})
+    if not total:
+        print(f"✓ No differences in {compared} objects")
+        return True
+    print(f"\n⚠ {len(changes['added'])} added, {len(changes['removed'])} removed, "
+          f"{len(changes['changed'])} changed of {compared} objects ({read} files read)")
+    return False
+
+
+def main():
+    """Main execution."""
+    parser = argparse.ArgumentParser(
+        description="Compare two directory-format schema dumps, reading only the objects that changed.")
+    parser.add_argument("old", help="directory dump to compare from")
+    parser.add_argument("new", help="directory dump to compare to")
+    parser.add_argument("--object", action="append", dest="objects", metavar="NAME",
+                        help="compare only this object (an id such as tables/users, or a name); repeatable")
+    parser.add_argument("--stat", action="store_true",
+                        help="list the added, removed and changed objects without their diffs")
+    args = parser.parse_args()
+
+    for path in (args.old, args.new):
+        if not is_directory_dump(path):
+            print(f"✗ Error: {path} is not a directory dump (no {TOC_FILE}); extract it with --format directory")
+            return False
+    try:
+        return diff_dumps(args.old, args.new, args.objects, args.stat)
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Directory-Format Dumps
+Writes a dump as one SQL file per object (table, view, function, policy
+group, ...) plus a manifest, toc.json, that lists every object in restore
+order with its section, the objects it depends on and the SHA-256 of its
+file. Files are hashed and written by a pool of threads while the next
+objects render, and readers pick the objects they need from the manifest
+instead of parsing one monolithic script: a partial restore reads the
+selected objects and their dependencies, a diff only the files whose hashes
+differ.
+"""
+
+import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+TOC_FILE = "toc.json"
+OBJECT_SUFFIX = ".sql"
+DEFAULT_WRITE_WORKERS = 4
+
+
+def object_id(kind: str, name: str) -> str:
+    """Return the manifest id of an object: its file path without the suffix."""
+    return f"{kind}/{name}"
+
+
+class DirectoryDumpWriter:
+    """Writes object files concurrently and records them in the manifest.
+
+    add() hands an object's SQL to the thread pool and returns at once;
+    closing the writer waits for every file and then writes toc.json, with
+    the objects in the order they were added, which must be a valid restore
+    order. Files of a previous dump in the same directory that this one no
+    longer has are removed.
+    """
+
+    def __init__(self, directory: str, workers: int = DEFAULT_WRITE_WORKERS, preamble: str = "",
+                 **fields: Any):
+        """Prepare a writer for `directory`; `preamble` starts every file, `fields` go into the manifest."""
+        self.directory = Path(directory)
+        self.workers = max(workers, 1)
+        self.preamble = preamble
+        self.fields = fields
+        self.objects = []
+        self._futures = []
+        self._executor = None
+
+    def __enter__(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._executor.shutdown(wait=True)
+        if exc_type is None:
+            self.close()
+        return False
+
+    def add(self, kind: str, name: str, section: str, sql: str, depends: Iterable[str] = ()):
+        """Queue one object's file; depends lists the ids of the objects it needs."""
+        entry = {
+            "id": object_id(kind, name),
+            "kind": kind,
+            "name": name,
+            "section": section,
+            "file": f"{object_id(kind, name)}{OBJECT_SUFFIX}",
+            "depends": sorted(set(depends)),
+        }
+        self.objects.append(entry)
+        self._futures.append(self._executor.submit(self._write, entry, self.preamble + sql))
+
+    def _write(self, entry: Dict[str, Any], text: str):
+        data = text.encode('utf-8')
+        path = self.directory / entry['file']
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        entry['sha256'] = hashlib.sha256(data).hexdigest()
+        entry['bytes'] = len(data)
+
+    def close(self) -> Dict[str, Any]:
+        """Wait for the files, write the manifest and drop stale files; return the manifest."""
+        for future in self._futures:
+            # Re-raise the first failed write.
+            future.result()
+
+        stale = set()
+        if (self.directory / TOC_FILE).exists():
+            stale = {entry['file'] for entry in read_toc(str(self.directory))['objects']}
+        stale -= {entry['file'] for entry in self.objects}
+        for file in stale:
+            (self.directory / file).unlink(missing_ok=True)
+
+        # No timestamp, so re-extracting an unchanged catalog rewrites the same toc.json.
+        manifest = {
+            "format": "directory",
+            **self.fields,
+            "objects": self.objects,
+        }
+        # Readers trust the manifest; never leave a half-written one.
+        temporary = self.directory / f"{TOC_FILE}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, self.directory / TOC_FILE)
+        return manifest
+
+
+def is_directory_dump(path: str) -> bool:
+    """Whether path is a directory-format dump."""
+    return (Path(path) / TOC_FILE).is_file()
+
+
+def read_toc(directory: str) -> Dict[str, Any]:
+    """Load the manifest of a directory dump."""
+    with open(Path(directory) / TOC_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def select_objects(toc: Dict[str, Any], names: Iterable[str]) -> List[Dict[str, Any]]:
+    """Return the entries for `names` and everything they depend on, in restore order.
+
+    A name is an object id (tables/users) or a bare object name (users),
+    which selects every object of that name: the table, its data, indexes,
+    foreign keys and policies. Schema objects are always included. Entries
+    that were only pulled in as dependencies come back as copies with
+    "dependency": True, so a restore can leave the ones that already exist
+    alone.
+    """
+    by_id = {entry['id']: entry for entry in toc['objects']}
+    pending = []
+    for name in names:
+        matches = [entry['id'] for entry in toc['objects'] if name in (entry['id'], entry['name'])]
+        if not matches:
+            raise ValueError(f"No object {name!r} in the dump")
+        pending.extend(matches)
+
+    selected = {entry['id'] for entry in toc['objects'] if entry['kind'] == "schema"}
+    requested = selected | set(pending)
+    while pending:
+        current = pending.pop()
+        if current in selected or current not in by_id:
+            continue
+        selected.add(current)
+        pending.extend(by_id[current]['depends'])
+    return [
+        entry if entry['id'] in requested else dict(entry, dependency=True)
+        for entry in toc['objects'] if entry['id'] in selected
+    ]
+
+
+def read_object(directory: str, entry: Dict[str, Any]) -> bytes:
+    """Return the contents of an object's file, checked against its manifest hash."""
+    with open(Path(directory) / entry['file'], 'rb') as f:
+        data = f.read()
+    if 'sha256' in entry and hashlib.sha256(data).hexdigest() != entry['sha256']:
+        raise ValueError(f"{entry['file']} does not match its hash in {TOC_FILE}")
+    return data
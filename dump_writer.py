@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Streaming SQL Dump Writer
+Writes rendered dump chunks to disk as they are produced, so peak memory is
+bounded by the write buffer instead of the size of the dump. Output can be
+compressed with gzip or lzma (xz) on a background thread, which overlaps the
+compression with whatever produces the data; compressed dumps and data files
+are read back transparently with open_dump().
+"""
+
+import io
+import os
+import gzip
+import lzma
+import queue
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+# Size of the write buffer between the renderers and the output file.
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+# Stdlib codecs only, so every host that restores can read them.
+COMPRESSIONS = ("gzip", "lzma")
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "lzma": ".xz"}
+# gzip level (1-9) or lzma preset (0-9).
+DEFAULT_COMPRESSION_LEVEL = 6
+# Buffers waiting for the compression thread; bounds memory when the codec
+# is slower than the producer.
+COMPRESSION_QUEUE_DEPTH = 8
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_XZ_MAGIC = b"\xfd7zXZ\x00"
+
+
+def compressed_name(path: str, compression: Optional[str]) -> str:
+    """Return path with the suffix of `compression` (gzip: .gz, lzma: .xz) appended, if any."""
+    return path + COMPRESSION_SUFFIXES[compression] if compression else path
+
+
+class CompressingWriter(io.RawIOBase):
+    """Raw binary file that compresses and writes its data on a background thread.
+
+    write() queues the data and returns, so the producer (the dump
+    renderers, a COPY stream) keeps going while earlier buffers are
+    compressed; zlib and liblzma release the GIL while they work. Wrap it
+    in an io.BufferedWriter so the thread gets large buffers (see
+    open_compressed). An error of the thread is raised by the next write()
+    or by close().
+    """
+
+    def __init__(self, path: str, compression: str, level: int = DEFAULT_COMPRESSION_LEVEL):
+        super().__init__()
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression!r} (expected one of {', '.join(COMPRESSIONS)})")
+        self._raw = open(path, 'wb')
+        if compression == "gzip":
+            # mtime=0: the same content always compresses to the same bytes.
+            self._codec = gzip.GzipFile(filename='', fileobj=self._raw, mode='wb', compresslevel=level, mtime=0)
+        else:
+            self._codec = lzma.LZMAFile(self._raw, 'wb', preset=level)
+        self._queue = queue.Queue(COMPRESSION_QUEUE_DEPTH)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name=f"compress {Path(path).name}", daemon=True)
+        self._thread.start()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._error is not None:
+            raise self._error
+        # The caller may reuse its buffer once write() returns; queue a copy.
+        self._queue.put(bytes(data))
+        return len(data)
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is None:
+                try:
+                    self._codec.write(data)
+                except Exception as e:
+                    # Keep draining, so the producer never blocks on a full queue.
+                    self._error = e
+
+    def close(self):
+        """Compress what is queued, then finish the stream and close the file."""
+        if self.closed:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            if self._error is None:
+                self._codec.close()
+        finally:
+            self._raw.close()
+            super().close()
+        if self._error is not None:
+            raise self._error
+
+
+def open_compressed(path: str, compression: Optional[str] = None, level: int = DEFAULT_COMPRESSION_LEVEL,
+                    buffer_size: int = DEFAULT_BUFFER_SIZE) -> BinaryIO:
+    """Open path for buffered binary writing, compressed on a background thread if compression is set."""
+    if not compression:
+        return open(path, 'wb', buffering=buffer_size)
+    return io.BufferedWriter(CompressingWriter(path, compression, level), buffer_size)
+
+
+def dump_compression(path: str) -> Optional[str]:
+    """Return the compression of a file ("gzip" or "lzma"), told by its first bytes, or None."""
+    with open(path, 'rb') as f:
+        magic = f.read(len(_XZ_MAGIC))
+    if magic.startswith(_GZIP_MAGIC):
+        return "gzip"
+    if magic.startswith(_XZ_MAGIC):
+        return "lzma"
+    return None
+
+
+def open_dump(path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> BinaryIO:
+    """Open a dump or data file for binary reading; gzip and xz files are decompressed on the fly."""
+    compression = dump_compression(path)
+    if compression == "gzip":
+        return gzip.open(path, 'rb')
+    if compression == "lzma":
+        return lzma.open(path, 'rb')
+    return open(path, 'rb', buffering=buffer_size)
+
+
+class DumpWriter:
+    """Buffered writer that streams SQL chunks from generator renderers to a file.
+
+    The dump is written under a temporary name and moved over output_file
+    only once it is complete, so a run that fails halfway leaves the
+    previous dump (or none) rather than a truncated one.
+    """
+
+    def __init__(self, output_file: str, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 compression: Optional[str] = None, level: int = DEFAULT_COMPRESSION_LEVEL):
+        """Prepare a writer for `output_file`, compressed if compression is set; the file is opened on enter."""
+        self.output_file = output_file
+        self.buffer_size = buffer_size
+        self.compression = compression
+        self.level = level
+        self.chunks_written = 0
+        self._file = None
+        self._temporary = f"{output_file}.{os.getpid()}.tmp"
+
+    def __enter__(self):
+        if self.compression:
+            binary = open_compressed(self._temporary, self.compression, self.level, self.buffer_size)
+            self._file = io.TextIOWrapper(binary, encoding='utf-8')
+        else:
+            self._file = open(self._temporary, 'w', encoding='utf-8', buffering=self.buffer_size)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    def write(self, chunk: str):
+        """Write one rendered chunk."""
+        self._file.write(chunk)
+        self.chunks_written += 1
+
+    def write_all(self, chunks: Iterable[str]):
+        """Stream every chunk of a renderer to the file as it is produced."""
+        for chunk in chunks:
+            self.write(chunk)
+
+    def close(self):
+        """Flush and close the output, then move it into place as output_file."""
+        if self._file:
+            try:
+                self._file.close()
+            except Exception:
+                self._file = None
+                Path(self._temporary).unlink(missing_ok=True)
+                raise
+            self._file = None
+            os.replace(self._temporary, self.output_file)
+
+    def discard(self):
+        """Close and remove the partial output, leaving output_file as it was."""
+        if self._file:
+            try:
+                self._file.close()
+            finally:
+                self._file = None
+                Path(self._temporary).unlink(missing_ok=True)
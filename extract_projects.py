@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Multi-Project Schema Extraction
+Extracts several Supabase projects, and several schemas per project, at the
+same time: every (project, schema) pair runs in its own worker process, on its
+own connection, and writes its own dump, metadata and log. The run ends with a
+timing and size report; as extractions mostly wait on their databases, the
+total wall time approaches that of the slowest extraction rather than the sum
+of all of them.
+
+Projects are listed in a JSON config file:
+
+    {
+      "projects": [
+        {"name": "prod", "database_url": "$PROD_DATABASE_URL", "schemas": ["public", "billing"]},
+        {"name": "staging", "database_url": "postgresql://...", "bulk": true}
+      ]
+    }
+
+$VARIABLES in database_url are expanded from the environment, so passwords
+need not be written into the config. "schemas" defaults to ["public"] and
+"bulk" to the --bulk option.
+"""
+
+import os
+import json
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+from extract_supabase_schema import DEFAULT_SCHEMA, SupabaseSchemaExtractor, write_outputs
+
+DEFAULT_CONFIG_FILE = "projects.json"
+DEFAULT_OUTPUT_DIR = "schema_dumps"
+REPORT_FILE = "report.json"
+# Extractions wait on the network far more than they use the CPU, so more
+# processes than cores still pay off; this only caps the default.
+MAX_DEFAULT_WORKERS = 8
+
+
+def load_jobs(config_file: str, output_dir: str, bulk: bool = False) -> List[Dict[str, Any]]:
+    """Read the config file and return one extraction job per (project, schema)."""
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    jobs = []
+    names = set()
+    for project in config.get("projects", []):
+        name = project.get("name")
+        if not name or name in names:
+            raise ValueError(f"Every project needs a unique name (got {name!r})")
+        names.add(name)
+
+        db_url = os.path.expandvars(project.get("database_url", ""))
+        if not db_url:
+            raise ValueError(f"Project {name} has no database_url")
+        if "$" in db_url:
+            raise ValueError(f"Project {name}: environment variable in database_url is not set")
+
+        for schema in project.get("schemas", [DEFAULT_SCHEMA]):
+            # The dump quotes the schema name, but it also names the job's output files.
+            if not schema or schema in (".", "..") or Path(schema).name != schema:
+                raise ValueError(f"Project {name}: schema {schema!r} cannot name an output file")
+            jobs.append({
+                "project": name,
+                "schema": schema,
+                "database_url": db_url,
+                "bulk": project.get("bulk", bulk),
+                "output_dir": str(Path(output_dir) / name),
+            })
+    if not jobs:
+        raise ValueError(f"No projects in {config_file}")
+    return jobs
+
+
+def extract_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract one schema of one project; runs in a worker process.
+
+    Writes <output_dir>/<schema>.sql, .json (metadata) and .log (the
+    extractor's output, which would otherwise interleave with the other
+    workers'), and returns the job's result for the report.
+    """
+    directory = Path(job['output_dir'])
+    directory.mkdir(parents=True, exist_ok=True)
+    output_file = directory / f"{job['schema']}.sql"
+    metadata_file = directory / f"{job['schema']}.json"
+    log_file = directory / f"{job['schema']}.log"
+
+    result = {
+        "project": job['project'],
+        "schema": job['schema'],
+        "status": "failed",
+        "dump": str(output_file),
+        "log": str(log_file),
+    }
+    started = time.perf_counter()
+    with open(log_file, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        extractor = SupabaseSchemaExtractor(job['database_url'], bulk=job['bulk'], schema=job['schema'])
+        try:
+            extractor.connect()
+            if write_outputs(extractor, str(output_file), str(metadata_file)):
+                # A schema without tables is most likely misspelled in the config.
+                result["status"] = "ok" if extractor.get_tables() else "empty"
+            result["tables"] = len(extractor.get_tables())
+            result["round_trips"] = extractor.round_trips
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            result["error"] = (str(e).strip() or type(e).__name__).splitlines()[0]
+        finally:
+            with contextlib.suppress(Exception):
+                extractor.close()
+
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    result["bytes"] = output_file.stat().st_size if output_file.exists() else 0
+    return result
+
+
+def run_jobs(jobs: List[Dict[str, Any]], workers: int) -> List[Dict[str, Any]]:
+    """Run the jobs in a process pool, printing each as it finishes; return results in job order."""
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(extract_job, job): index for index, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            job = jobs[futures[future]]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died; its own error handling never ran.
+                result = {"project": job['project'], "schema": job['schema'], "status": "failed",
+                          "seconds": 0.0, "bytes": 0, "error": f"worker crashed: {e}"}
+            results[futures[future]] = result
+
+            label = f"{result['project']}/{result['schema']}"
+            if result['status'] == "ok":
+                print(f"✓ {label}: {result['tables']} tables, {result['bytes'] / 1024:.1f} KB "
+                      f"in {result['seconds']:.2f} s")
+            elif result['status'] == "empty":
+                print(f"⚠ {label}: no tables in schema {result['schema']}")
+            else:
+                print(f"✗ {label}: {result.get('error', 'see ' + result.get('log', 'log'))}")
+    return [results[index] for index in range(len(jobs))]
+
+
+def print_report(results: List[Dict[str, Any]], wall_seconds: float):
+    """Print the per-extraction table and the run totals."""
+    print(f"\n{'Project':<20}{'Schema':<16}{'Status':<8}{'Tables':>8}{'Trips':>8}{'Time (s)':>10}{'Size (KB)':>12}")
+    print("-" * 82)
+    for result in results:
+        print(f"{result['project']:<20}{result['schema']:<16}{result['status']:<8}"
+              f"{result.get('tables', 0):>8}{result.get('round_trips', 0):>8}"
+              f"{result['seconds']:>10.2f}{result['bytes'] / 1024:>12.1f}")
+    print("-" * 82)
+
+    serial_seconds = sum(result['seconds'] for result in results)
+    slowest = max(results, key=lambda result: result['seconds'])
+    total_bytes = sum(result['bytes'] for result in results)
+    print(f"{'total':<44}{'':>8}{'':>8}{wall_seconds:>10.2f}{total_bytes / 1024:>12.1f}")
+    print(f"\n✓ Wall time {wall_seconds:.2f} s; slowest extraction {slowest['project']}/{slowest['schema']} "
+          f"{slowest['seconds']:.2f} s; one after another would take {serial_seconds:.2f} s")
+
+
+def main():
+    """Main execution."""
+    parser = argparse.ArgumentParser(
+        description="Extract the schemas of several Supabase projects concurrently, one process each.")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE,
+                        help=f"JSON file listing the projects and schemas (default: {DEFAULT_CONFIG_FILE})")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR,
+                        help=f"dumps are written to OUTPUT_DIR/<project>/<schema>.sql (default: {DEFAULT_OUTPUT_DIR})")
+    parser.add_argument("--workers", type=int,
+                        help=f"worker processes (default: one per extraction, at most {MAX_DEFAULT_WORKERS})")
+    parser.add_argument("--bulk", action="store_true",
+                        help="fetch each catalog relation once per schema, for projects that do not set \"bulk\"")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("MULTI-PROJECT SCHEMA EXTRACTION")
+    print("=" * 70 + "\n")
+
+    try:
+        jobs = load_jobs(args.config, args.output_dir, args.bulk)
+    except (OSError, ValueError) as e:
+        print(f"✗ Error: {e}")
+        return False
+
+    workers = args.workers or min(len(jobs), MAX_DEFAULT_WORKERS)
+    projects = len({job['project'] for job in jobs})
+    print(f"Extracting {len(jobs)} schema(s) of {projects} project(s) with {workers} worker process(es)...\n")
+
+    started = time.perf_counter()
+    results = run_jobs(jobs, workers)
+    wall_seconds = time.perf_counter() - started
+
+    print_report(results, wall_seconds)
+
+    report_file = Path(args.output_dir) / REPORT_FILE
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "generated": datetime.now().isoformat(),
+            "workers": workers,
+            "wall_seconds": round(wall_seconds, 3),
+            "serial_seconds": round(sum(result['seconds'] for result in results), 3),
+            "bytes": sum(result['bytes'] for result in results),
+            "extractions": results,
+        }, f, indent=2)
+    print(f"✓ Report: {report_file}")
+
+    return all(result['status'] != "failed" for result in results)
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
@@ -5,11 +5,66 @@ Uses psycopg2 to connect directly to Supabase PostgreSQL database.
 """
 
 import os
+import argparse
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from datetime import datetime
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import json
+import time
 from pathlib import Path
+from schema_graph import order_tables
+from catalog_model import (Column, Constraint, ForeignKey, Function, Index, Policy, Sequence, Table, Trigger,
+                           View, column_definition, fetch_records, foreign_key_clause, merged_foreign_keys)
+from query_metrics import QueryMetrics, cursor_phase, instrumented_cursor_factory, write_reports
+from phase_profiler import DEFAULT_TOP, PhaseProfiler, profile_phase
+from catalog_snapshot import (DEFAULT_SNAPSHOT_DIR, latest_snapshot, load_snapshot, project_from_url,
+                              save_snapshot)
+
+# Snapshot source tag; snapshots are only re-rendered by the extractor that wrote them.
+SNAPSHOT_SOURCE = "direct"
+
+# Per-table md5 of everything fetch_table_catalog() reads: columns, constraints,
+# indexes and triggers. An incremental run compares these against the previous
+# snapshot and only re-fetches the tables whose digest changed.
+TABLE_FINGERPRINTS_QUERY = """
+WITH rels AS (
+    SELECT c.oid, c.relname
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public'
+    AND c.relkind IN ('r', 'p')
+),
+facts AS (
+    SELECT a.attrelid AS relid,
+        'column ' || a.attnum || ' ' || a.attname || ' ' || format_type(a.atttypid, a.atttypmod) || ' '
+        || a.attnotnull || ' ' || coalesce(pg_get_expr(d.adbin, d.adrelid), '') AS fact
+    FROM pg_attribute a
+    JOIN rels r ON r.oid = a.attrelid
+    LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE a.attnum > 0 AND NOT a.attisdropped
+    UNION ALL
+    SELECT con.conrelid, 'constraint ' || con.conname || ' ' || pg_get_constraintdef(con.oid)
+    FROM pg_constraint con
+    JOIN rels r ON r.oid = con.conrelid
+    UNION ALL
+    SELECT i.indrelid, 'index ' || pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    JOIN rels r ON r.oid = i.indrelid
+    UNION ALL
+    SELECT t.tgrelid, 'trigger ' || pg_get_triggerdef(t.oid)
+    FROM pg_trigger t
+    JOIN rels r ON r.oid = t.tgrelid
+    WHERE NOT t.tgisinternal
+)
+SELECT r.relname AS table_name,
+    md5(r.oid::text || E'\\n' || coalesce(string_agg(f.fact, E'\\n' ORDER BY f.fact), '')) AS fingerprint
+FROM rels r
+LEFT JOIN facts f ON f.relid = r.oid
+GROUP BY r.oid, r.relname
+ORDER BY r.relname;
+"""
 
 def load_env():
     """Load environment variables from .env.local"""
@@ -78,20 +133,20 @@ def get_tables(cursor):
     ORDER BY table_name;
     """
     cursor.execute(query)
-    return [row['table_name'] for row in cursor.fetchall()]
+    return [row[0] for row in cursor.fetchall()]
 
-def get_table_schema(cursor, table_name):
-    """Get complete schema for a table."""
-    
-    section = f"\n-- ======================================================\n"
-    section += f"-- TABLE: {table_name}\n"
-    section += f"-- ======================================================\n\n"
-    section += f"DROP TABLE IF EXISTS {table_name} CASCADE;\n\n"
-    section += f"CREATE TABLE {table_name} (\n"
+def get_table_fingerprints(cursor):
+    """Get the catalog fingerprint of every table, keyed by table name."""
+    cursor.execute(TABLE_FINGERPRINTS_QUERY)
+    return {table_name: fingerprint for table_name, fingerprint in cursor.fetchall()}
+
+def fetch_table_catalog(cursor, table_name):
+    """Fetch the catalog rows needed to render one table, as a catalog_model Table."""
     
     # Get columns
     col_query = """
     SELECT 
+        c.table_name,
         c.column_name,
         c.data_type,
         c.character_maximum_length,
@@ -106,102 +161,139 @@ def get_table_schema(cursor, table_name):
     ORDER BY c.ordinal_position;
     """
     
-    cursor.execute(col_query, (table_name,))
-    columns = cursor.fetchall()
-    
-    col_defs = []
-    for col in columns:
-        col_def = f"    {col['column_name']} "
-        
-        # Map data types
-        data_type = col['data_type']
-        udt_name = col['udt_name']
-        
-        if data_type == 'character varying':
-            col_def += f"VARCHAR({col['character_maximum_length'] or 255})"
-        elif data_type == 'timestamp without time zone':
-            col_def += "TIMESTAMP"
-        elif data_type == 'timestamp with time zone':
-            col_def += "TIMESTAMPTZ"
-        elif data_type == 'numeric':
-            precision = col['numeric_precision'] or 10
-            scale = col['numeric_scale'] or 0
-            col_def += f"NUMERIC({precision},{scale})"
-        elif data_type == 'ARRAY':
-            col_def += f"{udt_name}[]"
-        else:
-            col_def += data_type
-        
-        # Add NOT NULL
-        if col['is_nullable'] == 'NO':
-            col_def += " NOT NULL"
-        
-        # Add DEFAULT
-        if col['column_default']:
-            col_def += f" DEFAULT {col['column_default']}"
-        
-        col_defs.append(col_def)
+    columns = fetch_records(cursor, Column, col_query, (table_name,))
     
     # Primary keys
     pk_query = """
-    SELECT constraint_name, string_agg(column_name, ', ' ORDER BY ordinal_position) as columns
-    FROM information_schema.constraint_column_usage
-    WHERE table_schema = 'public' 
-    AND table_name = %s
-    AND (constraint_name LIKE '%pkey' OR constraint_name LIKE 'pk_%')
-    GROUP BY constraint_name;
+    SELECT tc.table_name, tc.constraint_name, string_agg(kcu.column_name, ', ' ORDER BY kcu.ordinal_position) as columns
+    FROM information_schema.table_constraints tc
+    JOIN information_schema.key_column_usage kcu
+        ON kcu.constraint_name = tc.constraint_name
+        AND kcu.constraint_schema = tc.constraint_schema
+        AND kcu.table_name = tc.table_name
+    WHERE tc.table_schema = 'public' 
+    AND tc.table_name = %s
+    AND tc.constraint_type = 'PRIMARY KEY'
+    GROUP BY tc.table_name, tc.constraint_name
+    ORDER BY tc.constraint_name;
     """
     
-    cursor.execute(pk_query, (table_name,))
-    pk_result = cursor.fetchone()
-    if pk_result and pk_result['columns']:
-        col_defs.append(f"    PRIMARY KEY ({pk_result['columns']})")
+    primary_keys = fetch_records(cursor, Constraint, pk_query, (table_name,))
+    primary_key = primary_keys[0] if primary_keys else None
     
     # Unique constraints
     uc_query = """
-    SELECT constraint_name, string_agg(column_name, ', ' ORDER BY ordinal_position) as columns
-    FROM information_schema.constraint_column_usage
-    WHERE table_schema = 'public' 
-    AND table_name = %s
-    AND constraint_name LIKE '%unique%'
-    GROUP BY constraint_name;
+    SELECT tc.table_name, tc.constraint_name, string_agg(kcu.column_name, ', ' ORDER BY kcu.ordinal_position) as columns
+    FROM information_schema.table_constraints tc
+    JOIN information_schema.key_column_usage kcu
+        ON kcu.constraint_name = tc.constraint_name
+        AND kcu.constraint_schema = tc.constraint_schema
+        AND kcu.table_name = tc.table_name
+    WHERE tc.table_schema = 'public' 
+    AND tc.table_name = %s
+    AND tc.constraint_type = 'UNIQUE'
+    GROUP BY tc.table_name, tc.constraint_name
+    ORDER BY tc.constraint_name;
     """
     
-    cursor.execute(uc_query, (table_name,))
-    unique_constraints = cursor.fetchall()
-    for uc in unique_constraints:
-        if uc['columns']:
-            col_defs.append(f"    UNIQUE ({uc['columns']})")
+    unique_constraints = fetch_records(cursor, Constraint, uc_query, (table_name,))
     
-    # Foreign keys
+    # Foreign keys (from pg_constraint: the information_schema equivalent joins
+    # key_column_usage against itself and slows down quadratically with the
+    # number of constraints in the database)
     fk_query = """
     SELECT 
-        kcu1.constraint_name,
-        kcu1.column_name,
-        kcu2.table_name as referenced_table,
-        kcu2.column_name as referenced_column,
-        rc.delete_rule,
-        rc.update_rule
-    FROM information_schema.referential_constraints rc
-    JOIN information_schema.key_column_usage kcu1 
-        ON rc.constraint_name = kcu1.constraint_name
-        AND kcu1.table_schema = rc.constraint_schema
-    JOIN information_schema.key_column_usage kcu2 
-        ON rc.unique_constraint_name = kcu2.constraint_name
-        AND kcu2.table_schema = rc.unique_constraint_schema
-    WHERE kcu1.table_schema = 'public' AND kcu1.table_name = %s;
+        t.relname as table_name,
+        con.conname as constraint_name,
+        a.attname as column_name,
+        ref.relname as referenced_table,
+        ra.attname as referenced_column,
+        CASE con.confdeltype
+            WHEN 'c' THEN 'CASCADE' WHEN 'n' THEN 'SET NULL' WHEN 'd' THEN 'SET DEFAULT'
+            WHEN 'r' THEN 'RESTRICT' ELSE 'NO ACTION'
+        END as delete_rule,
+        CASE con.confupdtype
+            WHEN 'c' THEN 'CASCADE' WHEN 'n' THEN 'SET NULL' WHEN 'd' THEN 'SET DEFAULT'
+            WHEN 'r' THEN 'RESTRICT' ELSE 'NO ACTION'
+        END as update_rule
+    FROM pg_constraint con
+    JOIN pg_class t ON t.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_class ref ON ref.oid = con.confrelid
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, refattnum, position)
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    JOIN pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.refattnum
+    WHERE con.contype = 'f'
+    AND n.nspname = 'public' AND t.relname = %s
+    ORDER BY con.conname, k.position;
+    """
+    
+    foreign_keys = fetch_records(cursor, ForeignKey, fk_query, (table_name,))
+    
+    # Indexes
+    idx_query = """
+    SELECT tablename as table_name, indexname, indexdef
+    FROM pg_indexes
+    WHERE schemaname = 'public' AND tablename = %s
+    -- indexes backing primary keys and unique constraints come with the constraint
+    AND indexname NOT IN (SELECT conname FROM pg_constraint
+                          WHERE contype IN ('p', 'u') AND connamespace = 'public'::regnamespace)
+    ORDER BY indexname;
+    """
+    
+    indexes = fetch_records(cursor, Index, idx_query, (table_name,))
+    
+    # Triggers
+    trigger_query = """
+    SELECT event_object_table as table_name, trigger_name, event_manipulation, action_timing,
+        action_orientation, action_statement
+    FROM information_schema.triggers
+    WHERE event_object_schema = 'public' AND event_object_table = %s
+    ORDER BY trigger_name, event_manipulation;
+    """
+    
+    triggers = fetch_records(cursor, Trigger, trigger_query, (table_name,))
+    
+    return Table(table_name, columns, primary_key, unique_constraints, foreign_keys, indexes, triggers)
+
+def table_order(catalog):
+    """Order the catalog's tables by their foreign keys (see schema_graph.order_tables)."""
+    references = {
+        table: [fk['referenced_table'] for fk in catalog['table_catalogs'][table]['foreign_keys']]
+        for table in catalog['tables']
+    }
+    return order_tables(catalog['tables'], references)
+
+def render_table_schema(table_name, table_catalog, deferred=frozenset()):
+    """Render the section for one table from its catalog rows.
+    
+    Foreign keys on the (table, referenced table) edges in `deferred` are
+    left out; they are added once every table of their cycle exists.
     """
     
-    cursor.execute(fk_query, (table_name,))
-    fks = cursor.fetchall()
-    for fk in fks:
-        fk_def = f"    CONSTRAINT {fk['constraint_name']} FOREIGN KEY ({fk['column_name']}) "
-        fk_def += f"REFERENCES {fk['referenced_table']} ({fk['referenced_column']})"
-        if fk['delete_rule'] != 'NO ACTION':
-            fk_def += f" ON DELETE {fk['delete_rule']}"
-        if fk['update_rule'] != 'NO ACTION':
-            fk_def += f" ON UPDATE {fk['update_rule']}"
-        col_defs.append(fk_def)
+    section = f"\n-- ======================================================\n"
+    section += f"-- TABLE: {table_name}\n"
+    section += f"-- ======================================================\n\n"
+    section += f"DROP TABLE IF EXISTS {table_name} CASCADE;\n\n"
+    section += f"CREATE TABLE {table_name} (\n"
+    
+    col_defs = [f"    {column_definition(col)}" for col in table_catalog['columns']]
+    
+    # Primary keys
+    pk_result = table_catalog['primary_key']
+    if pk_result and pk_result['columns']:
+        col_defs.append(f"    PRIMARY KEY ({pk_result['columns']})")
+    
+    # Unique constraints
+    for uc in table_catalog['unique_constraints']:
+        if uc['columns']:
+            col_defs.append(f"    CONSTRAINT {uc['constraint_name']} UNIQUE ({uc['columns']})")
+    
+    # Foreign keys, one constraint per name whatever its number of columns
+    for name, fk in merged_foreign_keys(table_catalog['foreign_keys']).items():
+        if (table_name, fk['referenced_table']) in deferred:
+            continue
+        col_defs.append(f"    CONSTRAINT {name} {foreign_key_clause(fk)}")
     
     section += ",\n".join(col_defs)
     section += "\n);\n\n"
@@ -210,15 +302,7 @@ def get_table_schema(cursor, table_name):
     section += f"ALTER TABLE {table_name} ENABLE ROW LEVEL SECURITY;\n\n"
     
     # Indexes
-    idx_query = """
-    SELECT indexname, indexdef
-    FROM pg_indexes
-    WHERE schemaname = 'public' AND tablename = %s
-    AND indexname NOT LIKE '%_pkey';
-    """
-    
-    cursor.execute(idx_query, (table_name,))
-    indexes = cursor.fetchall()
+    indexes = table_catalog['indexes']
     if indexes:
         section += f"-- Indexes\n"
         for idx in indexes:
@@ -226,14 +310,7 @@ def get_table_schema(cursor, table_name):
         section += "\n"
     
     # Triggers
-    trigger_query = """
-    SELECT trigger_name, event_manipulation, action_timing, action_statement
-    FROM information_schema.triggers
-    WHERE event_object_schema = 'public' AND event_object_table = %s;
-    """
-    
-    cursor.execute(trigger_query, (table_name,))
-    triggers = cursor.fetchall()
+    triggers = table_catalog['triggers']
     if triggers:
         section += f"-- Triggers\n"
         for trigger in triggers:
@@ -242,6 +319,36 @@ def get_table_schema(cursor, table_name):
     
     return section
 
+def get_table_schema(cursor, table_name):
+    """Get complete schema for a table."""
+    return render_table_schema(table_name, fetch_table_catalog(cursor, table_name))
+
+def _fetch_table_with_pool(pool, table_name, metrics=None):
+    """Fetch one table's catalog rows on a connection borrowed from the pool."""
+    conn = pool.getconn()
+    try:
+        with conn.cursor(cursor_factory=instrumented_cursor_factory(metrics)) as cursor:
+            return fetch_table_catalog(cursor, table_name)
+    finally:
+        pool.putconn(conn)
+
+def fetch_table_catalogs(cursor, tables, pool=None, workers=1):
+    """Yield each table's catalog rows in table order.
+    
+    With a connection pool and more than one worker, tables are fetched
+    concurrently but results are still yielded in the order of `tables`,
+    so the dump is identical to a serial run. Worker queries are recorded
+    in the same metrics as `cursor`'s, if it is instrumented.
+    """
+    if pool is None or workers <= 1:
+        for table in tables:
+            yield fetch_table_catalog(cursor, table)
+        return
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        fetch = partial(_fetch_table_with_pool, pool, metrics=getattr(cursor, 'metrics', None))
+        yield from executor.map(fetch, tables)
+
 def get_views(cursor):
     """Get all views."""
     query = """
@@ -251,30 +358,28 @@ def get_views(cursor):
     ORDER BY table_name;
     """
     
-    cursor.execute(query)
-    return cursor.fetchall()
+    return fetch_records(cursor, View, query)
 
 def get_functions(cursor):
     """Get all user-defined functions."""
     query = """
     SELECT 
         p.proname as function_name,
+        pg_get_function_identity_arguments(p.oid) as arguments,
         pg_get_functiondef(p.oid) as definition
     FROM pg_proc p
     JOIN pg_namespace n ON n.oid = p.pronamespace
     WHERE n.nspname = 'public'
-    AND NOT p.proisagg
-    ORDER BY p.proname;
+    AND p.prokind <> 'a'
+    ORDER BY p.proname, arguments;
     """
     
-    cursor.execute(query)
-    return cursor.fetchall()
+    return fetch_records(cursor, Function, query)
 
 def get_sequences(cursor):
     """Get all sequences."""
     query = """
     SELECT 
-        sequence_schema,
         sequence_name,
         data_type,
         start_value,
@@ -287,14 +392,13 @@ def get_sequences(cursor):
     ORDER BY sequence_name;
     """
     
-    cursor.execute(query)
-    return cursor.fetchall()
+    return fetch_records(cursor, Sequence, query)
 
 def get_policies(cursor):
     """Get all RLS policies."""
     query = """
     SELECT 
-        tablename,
+        tablename as table_name,
         policyname,
         permissive,
         roles,
@@ -305,18 +409,92 @@ def get_policies(cursor):
     ORDER BY tablename, policyname;
     """
     
-    cursor.execute(query)
-    return cursor.fetchall()
+    return fetch_records(cursor, Policy, query)
+
+def extract_catalog(cursor, pool=None, workers=1, previous=None, profiler=None):
+    """Fetch every catalog relation the dump is rendered from.
+    
+    Pass a ThreadedConnectionPool and workers > 1 to fetch tables
+    concurrently. Pass the catalog of a previous snapshot as `previous` to
+    re-fetch only the tables whose fingerprint changed since; the others
+    are spliced in from the snapshot. The result holds catalog_model
+    records, which save_snapshot() stores as JSON. Pass a PhaseProfiler to profile
+    each step as its own phase.
+    """
+    
+    print("  - Extracting sequences...")
+    with cursor_phase(cursor, "sequences"), profile_phase(profiler, "sequences"):
+        sequences = get_sequences(cursor)
+    
+    print("  - Extracting tables...")
+    with cursor_phase(cursor, "tables"), profile_phase(profiler, "tables"):
+        # Fingerprint first: a change made during extraction then shows up on the next run.
+        fingerprints = get_table_fingerprints(cursor)
+        tables = get_tables(cursor)
+    
+    reusable = previous['table_catalogs'] if previous else {}
+    previous_fingerprints = previous.get('table_fingerprints', {}) if previous else {}
+    stale = [
+        table for table in tables
+        if table not in reusable
+        or fingerprints.get(table) is None
+        or fingerprints[table] != previous_fingerprints.get(table)
+    ]
+    with cursor_phase(cursor, "tables"), profile_phase(profiler, "tables"):
+        fetched = dict(zip(stale, fetch_table_catalogs(cursor, stale, pool, workers)))
+    
+    table_catalogs = {}
+    for table in tables:
+        if table in fetched:
+            print(f"    • {table}")
+            table_catalogs[table] = fetched[table]
+        else:
+            table_catalogs[table] = reusable[table]
+    if previous:
+        print(f"    ({len(stale)} changed, {len(tables) - len(stale)} reused from the previous snapshot)")
+    
+    print("  - Extracting views...")
+    with cursor_phase(cursor, "views"), profile_phase(profiler, "views"):
+        views = get_views(cursor)
+    
+    print("  - Extracting functions...")
+    with cursor_phase(cursor, "functions"), profile_phase(profiler, "functions"):
+        functions = get_functions(cursor)
+    
+    print("  - Extracting RLS policies...")
+    with cursor_phase(cursor, "policies"), profile_phase(profiler, "policies"):
+        policies = get_policies(cursor)
+    
+    return {
+        'sequences': sequences,
+        'tables': tables,
+        'table_catalogs': table_catalogs,
+        'table_fingerprints': fingerprints,
+        'views': views,
+        'functions': functions,
+        'policies': policies,
+    }
+
+def generate_sql_dump(cursor, output_file, pool=None, workers=1, previous=None, profiler=None):
+    """Generate complete SQL dump and return the catalog it was rendered from.
+    
+    Pass a ThreadedConnectionPool and workers > 1 to extract table
+    sections concurrently, a previous snapshot catalog to extract
+    incrementally, and a PhaseProfiler to profile the extraction steps and
+    the rendering (string building and file writing, phase "render").
+    """
+    catalog = extract_catalog(cursor, pool, workers, previous, profiler)
+    with profile_phase(profiler, "render"):
+        render_sql_dump(catalog, output_file)
+    return catalog
 
-def generate_sql_dump(cursor, output_file):
-    """Generate complete SQL dump."""
+def render_sql_dump(catalog, output_file):
+    """Render the SQL dump from extracted (or snapshotted) catalog rows."""
     
     with open(output_file, 'w', encoding='utf-8') as f:
         # Header
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        f.write(f"""-- ===============================================================
+        f.write("""-- ===============================================================
 -- SUPABASE COMPLETE DATABASE SCHEMA DUMP
--- Generated: {timestamp}
 -- Project: ynoxsibapzatlxhmredp
 -- Database: postgres
 -- ===============================================================
@@ -324,14 +502,13 @@ def generate_sql_dump(cursor, output_file):
 -- Includes: tables, constraints, indexes, functions, views, and RLS.
 -- ===============================================================
 
--- Disable foreign key checks during import
-SET session_replication_role = replica;
+-- Tables are created in foreign key dependency order;
+-- keys that close a reference cycle are added after them.
 
 """)
         
         # Sequences
-        print("  - Extracting sequences...")
-        sequences = get_sequences(cursor)
+        sequences = catalog['sequences']
         if sequences:
             f.write("-- ===============================================================\n")
             f.write("-- SEQUENCES\n")
@@ -347,20 +524,32 @@ SET session_replication_role = replica;
                     f.write(f"    CYCLE\n")
                 f.write(";\n\n")
         
-        # Tables
-        print("  - Extracting tables...")
-        tables = get_tables(cursor)
+        # Tables, wave by wave in dependency order
+        tables = catalog['tables']
         if tables:
+            order = table_order(catalog)
             f.write("-- ===============================================================\n")
             f.write("-- TABLES\n")
             f.write("-- ===============================================================\n")
-            for table in tables:
-                print(f"    • {table}")
-                f.write(get_table_schema(cursor, table))
+            for level, wave in enumerate(order['waves']):
+                f.write(f"\n-- Dependency level {level}: {len(wave)} table(s), independent of each other\n")
+                for table in wave:
+                    f.write(render_table_schema(table, catalog['table_catalogs'][table], order['deferred']))
+            
+            if order['deferred']:
+                f.write("\n-- ===============================================================\n")
+                f.write("-- DEFERRED FOREIGN KEYS (reference cycles)\n")
+                f.write("-- ===============================================================\n\n")
+                for cycle in order['cycles']:
+                    f.write(f"-- Cycle: {' -> '.join(cycle)}\n")
+                f.write("\n")
+                for table in order['levels']:
+                    for name, fk in merged_foreign_keys(catalog['table_catalogs'][table]['foreign_keys']).items():
+                        if (table, fk['referenced_table']) in order['deferred']:
+                            f.write(f"ALTER TABLE {table} ADD CONSTRAINT {name} {foreign_key_clause(fk)};\n")
         
         # Views
-        print("  - Extracting views...")
-        views = get_views(cursor)
+        views = catalog['views']
         if views:
             f.write("\n-- ===============================================================\n")
             f.write("-- VIEWS\n")
@@ -371,8 +560,7 @@ SET session_replication_role = replica;
                 f.write(f"{view['view_definition']};\n\n")
         
         # Functions
-        print("  - Extracting functions...")
-        functions = get_functions(cursor)
+        functions = catalog['functions']
         if functions:
             f.write("\n-- ===============================================================\n")
             f.write("-- FUNCTIONS AND PROCEDURES\n")
@@ -382,8 +570,7 @@ SET session_replication_role = replica;
                 f.write(f"{func['definition']};\n\n")
         
         # RLS Policies
-        print("  - Extracting RLS policies...")
-        policies = get_policies(cursor)
+        policies = catalog['policies']
         if policies:
             f.write("\n-- ===============================================================\n")
             f.write("-- ROW LEVEL SECURITY POLICIES\n")
@@ -391,14 +578,14 @@ SET session_replication_role = replica;
             
             current_table = None
             for policy in policies:
-                if policy['tablename'] != current_table:
-                    current_table = policy['tablename']
+                if policy['table_name'] != current_table:
+                    current_table = policy['table_name']
                     f.write(f"\n-- Policies for {current_table}\n")
                 
                 f.write(f"\nCREATE POLICY {policy['policyname']} ON {current_table}\n")
                 f.write(f"    AS {'PERMISSIVE' if policy['permissive'] else 'RESTRICTIVE'}\n")
                 f.write(f"    FOR ALL\n")
-                f.write(f"    TO {policy['roles'] or 'public'}\n")
+                f.write(f"    TO {', '.join(policy['roles']) if policy['roles'] else 'public'}\n")
                 
                 if policy['qual']:
                     f.write(f"    USING ({policy['qual']})\n")
@@ -408,15 +595,12 @@ SET session_replication_role = replica;
                 f.write(";\n")
         
         # Footer
-        f.write(f"""
+        f.write("""
 
 -- ===============================================================
 -- FINALIZATION
 -- ===============================================================
 
--- Re-enable foreign key checks
-SET session_replication_role = DEFAULT;
-
 -- Grant permissions (customize as needed)
 -- GRANT USAGE ON SCHEMA public TO authenticated, anon;
 -- GRANT ALL ON ALL TABLES IN SCHEMA public TO authenticated;
@@ -424,18 +608,60 @@ SET session_replication_role = DEFAULT;
 
 -- ===============================================================
 -- END OF SCHEMA DUMP
--- Generated: {timestamp}
 -- ===============================================================
 """)
 
 def main():
     """Main execution."""
     
+    parser = argparse.ArgumentParser(description="Extract the complete Supabase schema over a direct connection.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of pooled connections used to extract tables concurrently (default: 1)")
+    parser.add_argument("--from-snapshot", metavar="PATH",
+                        help="re-render the dump from a stored catalog snapshot, without connecting")
+    parser.add_argument("--snapshot-dir", default=DEFAULT_SNAPSHOT_DIR,
+                        help=f"directory for catalog snapshots (default: {DEFAULT_SNAPSHOT_DIR})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="re-fetch only the tables that changed since the latest catalog snapshot")
+    parser.add_argument("--metrics-report", metavar="PATH",
+                        help="write per-phase and per-query catalog query metrics as JSON to PATH")
+    parser.add_argument("--metrics-textfile", metavar="PATH",
+                        help="write the same metrics for the Prometheus node_exporter textfile collector to PATH")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile each phase with cProfile and tracemalloc; writes "
+                             "SUPABASE_COMPLETE_SCHEMA_DUMP.profile.pstats and .profile.txt")
+    parser.add_argument("--profile-top", type=int, default=DEFAULT_TOP, metavar="N",
+                        help=f"functions and allocation sites listed per phase with --profile (default: {DEFAULT_TOP})")
+    args = parser.parse_args()
+    
     print("\n" + "=" * 70)
     print("SUPABASE COMPLETE DATABASE SCHEMA EXTRACTOR")
     print("=" * 70 + "\n")
     
-    conn, env_vars = connect_to_supabase()
+    output_file = "SUPABASE_COMPLETE_SCHEMA_DUMP.sql"
+    profile_prefix = "SUPABASE_COMPLETE_SCHEMA_DUMP.profile"
+    profiler = PhaseProfiler(args.profile_top) if args.profile else None
+    
+    if args.from_snapshot:
+        try:
+            with profile_phase(profiler, "load_snapshot"):
+                snapshot = load_snapshot(args.from_snapshot, source=SNAPSHOT_SOURCE)
+            started = time.perf_counter()
+            with profile_phase(profiler, "render"):
+                render_sql_dump(snapshot['catalog'], output_file)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        except Exception as e:
+            print(f"✗ Error: {e}")
+            return False
+        
+        print(f"✓ Rendered from snapshot: {args.from_snapshot} ({snapshot['created']})")
+        print(f"✓ Output file: {output_file} ({elapsed_ms:.0f} ms)")
+        if profiler:
+            profiler.write(profile_prefix)
+        return True
+    
+    with profile_phase(profiler, "connect"):
+        conn, env_vars = connect_to_supabase()
     
     if not conn:
         print("\n⚠ Using fallback: Manual setup required")
@@ -443,13 +669,33 @@ def main():
         print("  python setup_supabase_connection.py")
         return False
     
+    pool = None
+    metrics = QueryMetrics(SNAPSHOT_SOURCE) if args.metrics_report or args.metrics_textfile else None
     try:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor(cursor_factory=instrumented_cursor_factory(metrics))
+        
+        if args.workers > 1:
+            pool = ThreadedConnectionPool(1, args.workers, env_vars['DATABASE_URL'])
+            print(f"✓ Connection pool ready ({args.workers} workers)")
+        
+        project = project_from_url(env_vars['DATABASE_URL'])
+        previous = None
+        if args.incremental:
+            previous_path = latest_snapshot(project, SNAPSHOT_SOURCE, args.snapshot_dir)
+            if previous_path:
+                try:
+                    previous = load_snapshot(previous_path, source=SNAPSHOT_SOURCE)['catalog']
+                    print(f"✓ Incremental extraction against {previous_path}")
+                except ValueError as e:
+                    print(f"⚠ Cannot extract incrementally, doing a full run: {e}")
+            else:
+                print("⚠ No previous catalog snapshot, doing a full run")
         
         print("\nExtracting schema...")
-        output_file = "SUPABASE_COMPLETE_SCHEMA_DUMP.sql"
         
-        generate_sql_dump(cursor, output_file)
+        catalog = generate_sql_dump(cursor, output_file, pool, args.workers, previous, profiler)
+        with profile_phase(profiler, "save_snapshot"):
+            snapshot_path = save_snapshot(catalog, project, SNAPSHOT_SOURCE, args.snapshot_dir)
         
         cursor.close()
         conn.close()
@@ -460,6 +706,7 @@ def main():
         print(f"\n✓ Schema extraction complete!")
         print(f"✓ Output file: {output_file}")
         print(f"✓ File size: {file_size:.2f} KB")
+        print(f"✓ Catalog snapshot: {snapshot_path}")
         
         print("\n" + "=" * 70)
         print("NEXT STEPS")
@@ -476,8 +723,14 @@ def main():
         print(f"\n✗ Error: {e}")
         return False
     finally:
+        if pool:
+            pool.closeall()
         if conn:
             conn.close()
+        if metrics:
+            write_reports(metrics, args.metrics_report, args.metrics_textfile)
+        if profiler:
+            profiler.write(profile_prefix)
 
 if __name__ == "__main__":
     success = main()
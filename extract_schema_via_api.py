@@ -6,17 +6,209 @@ without needing direct database password access.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
-from typing import List, Dict, Any
-from datetime import datetime
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 import base64
+from dump_writer import DumpWriter
+from catalog_model import column_definition
+from query_metrics import QueryMetrics, write_reports
+from phase_profiler import DEFAULT_TOP, PhaseProfiler, profile_phase
+
+# Helper RPC that returns the whole public catalog as one JSONB document, in
+# the same row shapes as the per-object queries below. CREATE OR REPLACE
+# keeps the installer idempotent; NOTIFY makes PostgREST expose it at once.
+# It returns every function body and policy, so only service_role may call
+# it: PostgREST would otherwise serve it to anyone holding the anon key.
+SCHEMA_SNAPSHOT_FUNCTION = """
+CREATE OR REPLACE FUNCTION public.schema_snapshot()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SET search_path = pg_catalog, public
+AS $snapshot$
+SELECT jsonb_build_object(
+    'tables', COALESCE((
+        SELECT jsonb_agg(table_name ORDER BY table_name)
+        FROM information_schema.tables
+        WHERE table_schema = 'public'
+        AND table_type = 'BASE TABLE'
+    ), '[]'::jsonb),
+    'columns', COALESCE((
+        SELECT jsonb_object_agg(table_name, rows)
+        FROM (
+            SELECT c.table_name, jsonb_agg(jsonb_build_object(
+                'column_name', c.column_name,
+                'data_type', c.data_type,
+                'character_maximum_length', c.character_maximum_length,
+                'numeric_precision', c.numeric_precision,
+                'numeric_scale', c.numeric_scale,
+                'is_nullable', c.is_nullable,
+                'column_default', c.column_default,
+                'ordinal_position', c.ordinal_position,
+                'udt_name', c.udt_name
+            ) ORDER BY c.ordinal_position) as rows
+            FROM information_schema.columns c
+            WHERE c.table_schema = 'public'
+            GROUP BY c.table_name
+        ) t
+    ), '{}'::jsonb),
+    'primary_keys', COALESCE((
+        SELECT jsonb_object_agg(table_name, rows)
+        FROM (
+            SELECT table_name, jsonb_agg(jsonb_build_object(
+                'constraint_name', constraint_name,
+                'columns', columns
+            ) ORDER BY constraint_name) as rows
+            FROM (
+                SELECT tc.table_name, tc.constraint_name,
+                       string_agg(kcu.column_name, ', ' ORDER BY kcu.ordinal_position) as columns
+                FROM information_schema.table_constraints tc
+                JOIN information_schema.key_column_usage kcu
+                    ON kcu.constraint_name = tc.constraint_name
+                    AND kcu.constraint_schema = tc.constraint_schema
+                    AND kcu.table_name = tc.table_name
+                WHERE tc.table_schema = 'public'
+                AND tc.constraint_type = 'PRIMARY KEY'
+                GROUP BY tc.table_name, tc.constraint_name
+            ) pk
+            GROUP BY table_name
+        ) t
+    ), '{}'::jsonb),
+    'foreign_keys', COALESCE((
+        SELECT jsonb_object_agg(table_name, rows)
+        FROM (
+            SELECT kcu1.table_name, jsonb_agg(jsonb_build_object(
+                'constraint_name', kcu1.constraint_name,
+                'column_name', kcu1.column_name,
+                'referenced_table', kcu2.table_name,
+                'referenced_column', kcu2.column_name,
+                'delete_rule', rc.delete_rule,
+                'update_rule', rc.update_rule
+            ) ORDER BY kcu1.constraint_name, kcu1.ordinal_position) as rows
+            FROM information_schema.referential_constraints rc
+            JOIN information_schema.key_column_usage kcu1
+                ON rc.constraint_name = kcu1.constraint_name
+                AND kcu1.constraint_schema = rc.constraint_schema
+            JOIN information_schema.key_column_usage kcu2
+                ON kcu2.constraint_name = rc.unique_constraint_name
+                AND kcu2.constraint_schema = rc.unique_constraint_schema
+                AND kcu2.ordinal_position = kcu1.position_in_unique_constraint
+            WHERE kcu1.table_schema = 'public'
+            GROUP BY kcu1.table_name
+        ) t
+    ), '{}'::jsonb),
+    'indexes', COALESCE((
+        SELECT jsonb_object_agg(tablename, rows)
+        FROM (
+            SELECT tablename, jsonb_agg(jsonb_build_object(
+                'indexname', indexname,
+                'indexdef', indexdef
+            ) ORDER BY indexname) as rows
+            FROM pg_indexes
+            WHERE schemaname = 'public'
+            AND indexname NOT LIKE '%_pkey'
+            GROUP BY tablename
+        ) t
+    ), '{}'::jsonb),
+    'views', COALESCE((
+        SELECT jsonb_agg(jsonb_build_object(
+            'table_name', table_name,
+            'view_definition', view_definition
+        ) ORDER BY table_name)
+        FROM information_schema.views
+        WHERE table_schema = 'public'
+    ), '[]'::jsonb),
+    'functions', COALESCE((
+        SELECT jsonb_agg(jsonb_build_object(
+            'function_name', p.proname,
+            'definition', pg_get_functiondef(p.oid)
+        ) ORDER BY p.proname, pg_get_function_identity_arguments(p.oid))
+        FROM pg_proc p
+        JOIN pg_namespace n ON n.oid = p.pronamespace
+        WHERE n.nspname = 'public'
+        AND p.prokind <> 'a'
+    ), '[]'::jsonb),
+    'policies', COALESCE((
+        SELECT jsonb_agg(jsonb_build_object(
+            'tablename', tablename,
+            'policyname', policyname,
+            'permissive', permissive,
+            'roles', roles,
+            'qual', qual,
+            'with_check', with_check
+        ) ORDER BY tablename, policyname)
+        FROM pg_policies
+        WHERE schemaname = 'public'
+    ), '[]'::jsonb)
+);
+$snapshot$;
+
+REVOKE EXECUTE ON FUNCTION public.schema_snapshot() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.schema_snapshot() TO service_role;
+
+NOTIFY pgrst, 'reload schema';
+"""
 
 class SupabaseSQLExtractor:
     """Extract schema using Supabase Management APIs."""
     
-    def __init__(self, project_url: str, anon_key: str, service_role_key: str = None):
-        """Initialize with Supabase credentials."""
+    TABLES_QUERY = """
+        SELECT table_name 
+        FROM information_schema.tables 
+        WHERE table_schema = 'public' 
+        AND table_type = 'BASE TABLE'
+        ORDER BY table_name;
+        """
+    
+    VIEWS_QUERY = """
+        SELECT table_name, view_definition
+        FROM information_schema.views
+        WHERE table_schema = 'public'
+        ORDER BY table_name;
+        """
+    
+    FUNCTIONS_QUERY = """
+        SELECT 
+            p.proname as function_name,
+            pg_get_functiondef(p.oid) as definition
+        FROM pg_proc p
+        JOIN pg_namespace n ON n.oid = p.pronamespace
+        WHERE n.nspname = 'public'
+        AND p.prokind <> 'a'
+        ORDER BY p.proname, pg_get_function_identity_arguments(p.oid);
+        """
+    
+    POLICIES_QUERY = """
+        SELECT 
+            tablename,
+            policyname,
+            permissive,
+            roles,
+            qual,
+            with_check
+        FROM pg_policies
+        WHERE schemaname = 'public'
+        ORDER BY tablename, policyname;
+        """
+    
+    def __init__(self, project_url: str, anon_key: str, service_role_key: str = None,
+                 pool_size: int = 10, metrics: QueryMetrics = None, profiler: PhaseProfiler = None):
+        """Initialize with Supabase credentials.
+        
+        Requests share one keep-alive session whose connection pool holds up
+        to `pool_size` connections, so concurrent RPC calls reuse TCP/TLS
+        connections instead of opening a new one per query.
+        
+        With metrics set, every SQL call is recorded in it together with the
+        dump section (phase) it was made for; with profiler set, fetching and
+        rendering each section are profiled as that phase.
+        """
         self.project_url = project_url
         self.anon_key = anon_key
         self.service_role_key = service_role_key or anon_key
@@ -25,20 +217,22 @@ class SupabaseSQLExtractor:
             'Content-Type': 'application/json',
             'apikey': self.anon_key
         }
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.metrics = metrics
+        self.profiler = profiler
     
-    def execute_sql(self, query: str) -> List[Dict]:
-        """Execute SQL query via Supabase SQL Editor API."""
-        url = f"{self.project_url}/rest/v1/rpc/sql"
-        
-        payload = {
-            "query": query
-        }
+    def call_rpc(self, function_name: str, payload: Dict = None) -> Any:
+        """Call a PostgREST RPC function and return its JSON body (None on failure)."""
+        url = f"{self.project_url}/rest/v1/rpc/{function_name}"
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 url,
                 headers=self.headers,
-                json=payload,
+                json=payload or {},
                 timeout=30
             )
             
@@ -46,23 +240,41 @@ class SupabaseSQLExtractor:
                 return response.json()
             else:
                 print(f"✗ SQL Error: {response.status_code} - {response.text}")
-                return []
+                return None
         except Exception as e:
             print(f"✗ Request failed: {e}")
-            return []
+            return None
+    
+    def execute_sql(self, query: str, phase: str = None) -> List[Dict]:
+        """Execute SQL query via Supabase SQL Editor API."""
+        started = time.perf_counter()
+        result = self.call_rpc("sql", {"query": query})
+        result = result if result is not None else []
+        if self.metrics is not None:
+            self.metrics.record(query, time.perf_counter() - started, len(result), phase)
+        return result
+    
+    def install_schema_snapshot_rpc(self) -> bool:
+        """Install (or replace) the schema_snapshot() helper function."""
+        self.execute_sql(SCHEMA_SNAPSHOT_FUNCTION)
+        
+        installed = self.execute_sql(
+            "SELECT to_regprocedure('public.schema_snapshot()') IS NOT NULL as installed;")
+        if installed and installed[0].get('installed'):
+            print("✓ schema_snapshot() installed")
+            return True
+        
+        print("✗ Unable to install schema_snapshot()")
+        return False
     
     def get_tables_via_sql(self) -> List[str]:
         """Get all tables using SQL."""
-        query = """
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public' 
-        AND table_type = 'BASE TABLE'
-        ORDER BY table_name;
-        """
-        
+        return self._parse_tables(self.execute_sql(self.TABLES_QUERY, "tables"))
+    
+    @staticmethod
+    def _parse_tables(results: List[Dict]) -> List[str]:
+        """Extract table names from a tables query result."""
         try:
-            results = self.execute_sql(query)
             return [row['table_name'] for row in results if results]
         except:
             return []
@@ -70,60 +282,190 @@ class SupabaseSQLExtractor:
     def extract_complete_schema(self, output_file: str = "supabase_schema_dump.sql"):
         """Extract complete schema using multiple SQL queries."""
         
-        print("=" * 70)
-        print("SUPABASE COMPLETE DATABASE SCHEMA EXTRACTION")
-        print("=" * 70)
-        print()
-        
-        sql_dump = self._generate_header()
+        self._print_banner()
         
         # Get all tables
         print("Extracting tables...")
-        tables = self.get_tables_via_sql()
+        with profile_phase(self.profiler, "tables"):
+            tables = self.get_tables_via_sql()
         
         if not tables:
-            print("✗ No tables found or unable to connect to database")
-            print("\nTroubleshooting:")
-            print("1. Verify VITE_SUPABASE_URL in .env.local")
-            print("2. Check that your Supabase project is active")
-            print("3. Ensure your project allows API access")
+            self._print_no_tables()
             return False
         
         print(f"✓ Found {len(tables)} tables")
         
+        self._write_dump(output_file, self._extract_sections(tables))
+        return True
+    
+    def _extract_sections(self, tables: List[str]) -> Iterator[Tuple[str, Iterator[str]]]:
+        """Fetch and render each dump section lazily, as the writer consumes it.
+        
+        Yields (phase, chunks) pairs; the fetch is profiled under the same
+        phase as the rendering _write_dump does.
+        """
         # Generate table schemas
         for table in tables:
             print(f"  - Extracting schema for: {table}")
-            sql_dump += self._generate_table_schema(table)
+            with profile_phase(self.profiler, "tables"):
+                section = self._generate_table_schema(table)
+            yield "tables", section
         
         # Get views
         print("Extracting views...")
-        sql_dump += self._generate_views_schema()
+        with profile_phase(self.profiler, "views"):
+            views = self.execute_sql(self.VIEWS_QUERY, "views")
+        yield "views", self._render_views_schema(views)
         
         # Get functions
         print("Extracting functions...")
-        sql_dump += self._generate_functions_schema()
+        with profile_phase(self.profiler, "functions"):
+            functions = self.execute_sql(self.FUNCTIONS_QUERY, "functions")
+        yield "functions", self._render_functions_schema(functions)
         
         # Get policies
         print("Extracting RLS policies...")
-        sql_dump += self._generate_policies_schema()
+        with profile_phase(self.profiler, "policies"):
+            policies = self.execute_sql(self.POLICIES_QUERY, "policies")
+        yield "policies", self._render_policies_schema(policies)
+    
+    def extract_complete_schema_pipelined(self, output_file: str = "supabase_schema_dump.sql",
+                                          concurrency: int = 8):
+        """Extract the same dump as extract_complete_schema with many RPC calls in flight."""
+        return asyncio.run(self.extract_complete_schema_async(output_file, concurrency))
+    
+    async def extract_complete_schema_async(self, output_file: str = "supabase_schema_dump.sql",
+                                            concurrency: int = 8):
+        """Extract complete schema with at most `concurrency` RPC calls in flight.
         
-        sql_dump += self._generate_footer()
+        The blocking requests calls run in a thread pool sized to the session's
+        connection pool; an asyncio semaphore bounds how many are outstanding.
+        All calls overlap, so the profiler sees them as a single "fetch" phase.
+        """
+        self._print_banner()
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        
+        with profile_phase(self.profiler, "fetch"), ThreadPoolExecutor(max_workers=concurrency) as executor:
+            async def run(query: str, phase: str) -> List[Dict]:
+                async with semaphore:
+                    return await loop.run_in_executor(executor, self.execute_sql, query, phase)
+            
+            # Views, functions and policies do not depend on the table list,
+            # so they are issued alongside it.
+            print("Extracting tables, views, functions and RLS policies...")
+            tables_task = asyncio.ensure_future(run(self.TABLES_QUERY, "tables"))
+            globals_task = asyncio.gather(
+                run(self.VIEWS_QUERY, "views"),
+                run(self.FUNCTIONS_QUERY, "functions"),
+                run(self.POLICIES_QUERY, "policies"),
+            )
+            
+            tables = self._parse_tables(await tables_task)
+            if not tables:
+                await globals_task
+                self._print_no_tables()
+                return False
+            
+            print(f"✓ Found {len(tables)} tables")
+            
+            async def fetch_table(table_name: str) -> Dict[str, List[Dict]]:
+                queries = self._table_queries(table_name)
+                results = await asyncio.gather(*(run(query, "tables") for query in queries.values()))
+                print(f"  - Extracted schema for: {table_name}")
+                return dict(zip(queries, results))
+            
+            table_results = await asyncio.gather(*(fetch_table(table) for table in tables))
+            views, functions, policies = await globals_task
+        
+        sections = [
+            ("tables", self._render_table_schema(table, results))
+            for table, results in zip(tables, table_results)
+        ]
+        sections += [
+            ("views", self._render_views_schema(views)),
+            ("functions", self._render_functions_schema(functions)),
+            ("policies", self._render_policies_schema(policies)),
+        ]
+        self._write_dump(output_file, sections)
+        return True
+    
+    def extract_complete_schema_snapshot(self, output_file: str = "supabase_schema_dump.sql"):
+        """Extract the complete schema in one schema_snapshot() RPC call."""
+        
+        self._print_banner()
+        
+        print("Fetching schema snapshot...")
+        started = time.perf_counter()
+        with profile_phase(self.profiler, "fetch"):
+            snapshot = self.call_rpc("schema_snapshot")
+        if self.metrics is not None:
+            self.metrics.record("SELECT public.schema_snapshot()", time.perf_counter() - started,
+                                1 if snapshot else 0, "snapshot")
+        
+        if not snapshot:
+            print("✗ schema_snapshot() unavailable")
+            print("  Install it first with: python extract_schema_via_api.py --install-snapshot-rpc")
+            print("  It can only be called with SUPABASE_SERVICE_ROLE_KEY set in .env.local")
+            return False
+        
+        tables = snapshot.get('tables') or []
+        if not tables:
+            self._print_no_tables()
+            return False
+        
+        print(f"✓ Found {len(tables)} tables")
         
-        # Write to file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(sql_dump)
+        sections = []
+        for table in tables:
+            results = {
+                name: snapshot.get(name, {}).get(table, [])
+                for name in ('columns', 'primary_keys', 'foreign_keys', 'indexes')
+            }
+            sections.append(("tables", self._render_table_schema(table, results)))
+        
+        sections += [
+            ("views", self._render_views_schema(snapshot.get('views'))),
+            ("functions", self._render_functions_schema(snapshot.get('functions'))),
+            ("policies", self._render_policies_schema(snapshot.get('policies'))),
+        ]
+        self._write_dump(output_file, sections)
+        return True
+    
+    def _print_banner(self):
+        """Print the extraction banner."""
+        print("=" * 70)
+        print("SUPABASE COMPLETE DATABASE SCHEMA EXTRACTION")
+        print("=" * 70)
+        print()
+    
+    def _print_no_tables(self):
+        """Print troubleshooting hints when no tables were returned."""
+        print("✗ No tables found or unable to connect to database")
+        print("\nTroubleshooting:")
+        print("1. Verify VITE_SUPABASE_URL in .env.local")
+        print("2. Check that your Supabase project is active")
+        print("3. Ensure your project allows API access")
+    
+    def _write_dump(self, output_file: str, sections: Iterable[Tuple[str, Iterable[str]]]):
+        """Stream the header, every rendered (phase, section) and the footer to the output file."""
+        with DumpWriter(output_file) as writer:
+            with profile_phase(self.profiler, "header"):
+                writer.write_all(self._generate_header())
+            for phase, section in sections:
+                with profile_phase(self.profiler, phase):
+                    writer.write_all(section)
+            with profile_phase(self.profiler, "footer"):
+                writer.write_all(self._generate_footer())
         
         print()
         print(f"✓ Schema dump saved to: {output_file}")
-        return True
     
-    def _generate_header(self) -> str:
+    def _generate_header(self) -> Iterator[str]:
         """Generate SQL dump header."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return f"""-- ===============================================================
+        yield """-- ===============================================================
 -- SUPABASE COMPLETE DATABASE SCHEMA DUMP
--- Generated: {timestamp}
 -- Project: ynoxsibapzatlxhmredp
 -- ===============================================================
 -- This script recreates the entire database structure including:
@@ -141,14 +483,10 @@ SET session_replication_role = replica;
 
 """
     
-    def _generate_table_schema(self, table_name: str) -> str:
-        """Generate CREATE TABLE statement for a table."""
-        section = f"\n-- ======================================================\n"
-        section += f"-- TABLE: {table_name}\n"
-        section += f"-- ======================================================\n\n"
-        
-        # Get column information
-        col_query = f"""
+    def _table_queries(self, table_name: str) -> Dict[str, str]:
+        """Return the catalog queries needed to render one table."""
+        return {
+            'columns': f"""
         SELECT 
             c.column_name,
             c.data_type,
@@ -157,263 +495,212 @@ SET session_replication_role = replica;
             c.numeric_scale,
             c.is_nullable,
             c.column_default,
-            c.ordinal_position
+            c.ordinal_position,
+            c.udt_name
         FROM information_schema.columns c
         WHERE c.table_schema = 'public' AND c.table_name = '{table_name}'
         ORDER BY c.ordinal_position;
-        """
+        """,
+            'primary_keys': f"""
+        SELECT tc.constraint_name, string_agg(kcu.column_name, ', ' ORDER BY kcu.ordinal_position) as columns
+        FROM information_schema.table_constraints tc
+        JOIN information_schema.key_column_usage kcu
+            ON kcu.constraint_name = tc.constraint_name
+            AND kcu.constraint_schema = tc.constraint_schema
+            AND kcu.table_name = tc.table_name
+        WHERE tc.table_schema = 'public' 
+        AND tc.table_name = '{table_name}'
+        AND tc.constraint_type = 'PRIMARY KEY'
+        GROUP BY tc.constraint_name;
+        """,
+            'foreign_keys': f"""
+        SELECT 
+            kcu1.constraint_name,
+            kcu1.column_name,
+            kcu2.table_name as referenced_table,
+            kcu2.column_name as referenced_column,
+            rc.delete_rule,
+            rc.update_rule
+        FROM information_schema.referential_constraints rc
+        JOIN information_schema.key_column_usage kcu1 
+            ON rc.constraint_name = kcu1.constraint_name
+            AND kcu1.constraint_schema = rc.constraint_schema
+        JOIN information_schema.key_column_usage kcu2 
+            ON kcu2.constraint_name = rc.unique_constraint_name
+            AND kcu2.constraint_schema = rc.unique_constraint_schema
+            AND kcu2.ordinal_position = kcu1.position_in_unique_constraint
+        WHERE kcu1.table_schema = 'public' AND kcu1.table_name = '{table_name}'
+        ORDER BY kcu1.constraint_name, kcu1.ordinal_position;
+        """,
+            'indexes': f"""
+        SELECT indexname, indexdef
+        FROM pg_indexes
+        WHERE schemaname = 'public' AND tablename = '{table_name}'
+        AND indexname NOT LIKE '%_pkey'
+        ORDER BY indexname;
+        """,
+        }
+    
+    def _generate_table_schema(self, table_name: str) -> Iterator[str]:
+        """Generate CREATE TABLE statement for a table."""
+        queries = self._table_queries(table_name)
+        results = {name: self.execute_sql(query, "tables") for name, query in queries.items()}
+        return self._render_table_schema(table_name, results)
+    
+    def _render_table_schema(self, table_name: str, results: Dict[str, List[Dict]]) -> Iterator[str]:
+        """Render a table section from its catalog query results."""
+        yield (f"\n-- ======================================================\n"
+               f"-- TABLE: {table_name}\n"
+               f"-- ======================================================\n\n")
         
-        section += f"DROP TABLE IF EXISTS {table_name} CASCADE;\n\n"
-        section += f"CREATE TABLE {table_name} (\n"
+        yield f"DROP TABLE IF EXISTS {table_name} CASCADE;\n\n"
+        yield f"CREATE TABLE {table_name} (\n"
         
         try:
-            columns = self.execute_sql(col_query)
+            columns = results['columns']
             
-            col_defs = []
-            for col in columns:
-                col_def = f"    {col['column_name']} "
-                
-                # Map data types
-                data_type = col['data_type']
-                if data_type == 'character varying':
-                    col_def += f"VARCHAR({col['character_maximum_length'] or 255})"
-                elif data_type == 'timestamp without time zone':
-                    col_def += "TIMESTAMP"
-                elif data_type == 'timestamp with time zone':
-                    col_def += "TIMESTAMPTZ"
-                elif data_type == 'numeric':
-                    precision = col['numeric_precision'] or 10
-                    scale = col['numeric_scale'] or 0
-                    col_def += f"NUMERIC({precision},{scale})"
-                else:
-                    col_def += data_type
-                
-                # Add NOT NULL
-                if col['is_nullable'] == 'NO':
-                    col_def += " NOT NULL"
-                
-                # Add DEFAULT
-                if col['column_default']:
-                    col_def += f" DEFAULT {col['column_default']}"
-                
-                col_defs.append(col_def)
+            col_defs = [f"    {column_definition(col)}" for col in columns]
             
-            section += ",\n".join(col_defs)
-            section += "\n);\n\n"
+            yield ",\n".join(col_defs) + "\n);\n\n"
             
-            # Get and add constraints
-            section += self._add_table_constraints(table_name)
+            # Add constraints
+            yield from self._render_table_constraints(
+                table_name, results['primary_keys'], results['foreign_keys'])
             
-            # Get and add indexes
-            section += self._add_table_indexes(table_name)
+            # Add indexes
+            yield from self._render_table_indexes(results['indexes'])
             
             # Enable RLS
-            section += f"ALTER TABLE {table_name} ENABLE ROW LEVEL SECURITY;\n\n"
+            yield f"ALTER TABLE {table_name} ENABLE ROW LEVEL SECURITY;\n\n"
             
         except Exception as e:
-            section += f"-- Error extracting columns: {e}\n"
-        
-        return section
+            yield f"-- Error extracting columns: {e}\n"
     
-    def _add_table_constraints(self, table_name: str) -> str:
-        """Add constraints (PK, FK, UNIQUE) for a table."""
-        section = ""
-        
+    def _render_table_constraints(self, table_name: str, pks: List[Dict], fks: List[Dict]) -> Iterator[str]:
+        """Render constraints (PK, FK) for a table."""
         # Primary Keys
-        pk_query = f"""
-        SELECT constraint_name, string_agg(column_name, ', ' ORDER BY ordinal_position) as columns
-        FROM information_schema.constraint_column_usage
-        WHERE table_schema = 'public' 
-        AND table_name = '{table_name}'
-        AND (constraint_name LIKE '%pkey' OR constraint_name LIKE 'pk_%')
-        GROUP BY constraint_name;
-        """
-        
         try:
-            pks = self.execute_sql(pk_query)
             if pks and len(pks) > 0:
                 for pk in pks:
-                    section += f"ALTER TABLE {table_name} ADD PRIMARY KEY ({pk['columns']});\n"
+                    yield f"ALTER TABLE {table_name} ADD PRIMARY KEY ({pk['columns']});\n"
         except:
             pass
         
         # Foreign Keys
-        fk_query = f"""
-        SELECT 
-            kcu1.constraint_name,
-            kcu1.column_name,
-            kcu2.table_name as referenced_table,
-            kcu2.column_name as referenced_column,
-            rc.delete_rule,
-            rc.update_rule
-        FROM information_schema.referential_constraints rc
-        JOIN information_schema.key_column_usage kcu1 
-            ON rc.constraint_name = kcu1.constraint_name
-        JOIN information_schema.key_column_usage kcu2 
-            ON rc.unique_constraint_name = kcu2.constraint_name
-        WHERE kcu1.table_schema = 'public' AND kcu1.table_name = '{table_name}';
-        """
-        
         try:
-            fks = self.execute_sql(fk_query)
             if fks and len(fks) > 0:
-                section += "\n-- Foreign Keys\n"
+                yield "\n-- Foreign Keys\n"
+                # Composite keys come one row per column pair, in key order.
+                constraints = {}
                 for fk in fks:
-                    section += f"ALTER TABLE {table_name}\n"
-                    section += f"    ADD CONSTRAINT {fk['constraint_name']}\n"
-                    section += f"    FOREIGN KEY ({fk['column_name']})\n"
-                    section += f"    REFERENCES {fk['referenced_table']} ({fk['referenced_column']})"
+                    constraints.setdefault(fk['constraint_name'], []).append(fk)
+                for name, pairs in constraints.items():
+                    fk = pairs[0]
+                    statement = f"ALTER TABLE {table_name}\n"
+                    statement += f"    ADD CONSTRAINT {name}\n"
+                    statement += f"    FOREIGN KEY ({', '.join(pair['column_name'] for pair in pairs)})\n"
+                    statement += (f"    REFERENCES {fk['referenced_table']} "
+                                  f"({', '.join(pair['referenced_column'] for pair in pairs)})")
                     
                     if fk['delete_rule'] != 'NO ACTION':
-                        section += f"\n    ON DELETE {fk['delete_rule']}"
+                        statement += f"\n    ON DELETE {fk['delete_rule']}"
                     if fk['update_rule'] != 'NO ACTION':
-                        section += f"\n    ON UPDATE {fk['update_rule']}"
+                        statement += f"\n    ON UPDATE {fk['update_rule']}"
                     
-                    section += ";\n"
+                    yield statement + ";\n"
         except:
             pass
-        
-        return section
     
-    def _add_table_indexes(self, table_name: str) -> str:
-        """Add indexes for a table."""
-        section = ""
-        
-        idx_query = f"""
-        SELECT indexname, indexdef
-        FROM pg_indexes
-        WHERE schemaname = 'public' AND tablename = '{table_name}'
-        AND indexname NOT LIKE '%_pkey';
-        """
-        
+    def _render_table_indexes(self, indexes: List[Dict]) -> Iterator[str]:
+        """Render indexes for a table."""
         try:
-            indexes = self.execute_sql(idx_query)
             if indexes and len(indexes) > 0:
-                section += "\n-- Indexes\n"
+                yield "\n-- Indexes\n"
                 for idx in indexes:
-                    section += f"{idx['indexdef']};\n"
-                section += "\n"
+                    yield f"{idx['indexdef']};\n"
+                yield "\n"
         except:
             pass
-        
-        return section
     
-    def _generate_views_schema(self) -> str:
+    def _render_views_schema(self, views: List[Dict]) -> Iterator[str]:
         """Generate CREATE VIEW statements."""
-        section = """
+        yield """
 -- ======================================================
 -- VIEWS
 -- ======================================================
 
 """
         
-        view_query = """
-        SELECT table_name, view_definition
-        FROM information_schema.views
-        WHERE table_schema = 'public'
-        ORDER BY table_name;
-        """
-        
         try:
-            views = self.execute_sql(view_query)
             if views and len(views) > 0:
                 for view in views:
-                    section += f"DROP VIEW IF EXISTS {view['table_name']} CASCADE;\n"
-                    section += f"CREATE VIEW {view['table_name']} AS\n"
-                    section += f"{view['view_definition']};\n\n"
+                    yield (f"DROP VIEW IF EXISTS {view['table_name']} CASCADE;\n"
+                           f"CREATE VIEW {view['table_name']} AS\n")
+                    yield f"{view['view_definition']};\n\n"
             else:
-                section += "-- No views found\n\n"
+                yield "-- No views found\n\n"
         except:
-            section += "-- Unable to extract views\n\n"
-        
-        return section
+            yield "-- Unable to extract views\n\n"
     
-    def _generate_functions_schema(self) -> str:
+    def _render_functions_schema(self, functions: List[Dict]) -> Iterator[str]:
         """Generate CREATE FUNCTION statements."""
-        section = """
+        yield """
 -- ======================================================
 -- FUNCTIONS AND PROCEDURES
 -- ======================================================
 
 """
         
-        func_query = """
-        SELECT 
-            p.proname as function_name,
-            pg_get_functiondef(p.oid) as definition
-        FROM pg_proc p
-        JOIN pg_namespace n ON n.oid = p.pronamespace
-        WHERE n.nspname = 'public'
-        AND NOT p.proisagg
-        ORDER BY p.proname;
-        """
-        
         try:
-            functions = self.execute_sql(func_query)
             if functions and len(functions) > 0:
                 for func in functions:
-                    section += f"-- Function: {func['function_name']}\n"
-                    section += f"{func['definition']};\n\n"
+                    yield f"-- Function: {func['function_name']}\n"
+                    yield f"{func['definition']};\n\n"
             else:
-                section += "-- No custom functions found\n\n"
+                yield "-- No custom functions found\n\n"
         except:
-            section += "-- Unable to extract functions\n\n"
-        
-        return section
+            yield "-- Unable to extract functions\n\n"
     
-    def _generate_policies_schema(self) -> str:
+    def _render_policies_schema(self, policies: List[Dict]) -> Iterator[str]:
         """Generate RLS policy statements."""
-        section = """
+        yield """
 -- ======================================================
 -- ROW LEVEL SECURITY (RLS) POLICIES
 -- ======================================================
 
 """
         
-        policy_query = """
-        SELECT 
-            tablename,
-            policyname,
-            permissive,
-            roles,
-            qual,
-            with_check
-        FROM pg_policies
-        WHERE schemaname = 'public'
-        ORDER BY tablename, policyname;
-        """
-        
         try:
-            policies = self.execute_sql(policy_query)
             if policies and len(policies) > 0:
                 current_table = None
                 for policy in policies:
                     if policy['tablename'] != current_table:
                         current_table = policy['tablename']
-                        section += f"\n-- Policies for {current_table}\n"
+                        yield f"\n-- Policies for {current_table}\n"
+                    
+                    # roles arrive as a JSON array, from the sql RPC as from schema_snapshot().
+                    roles = ", ".join(policy['roles']) if policy['roles'] else "PUBLIC"
                     
-                    section += f"\nCREATE POLICY {policy['policyname']} ON {current_table}\n"
-                    section += f"    AS {'PERMISSIVE' if policy['permissive'] else 'RESTRICTIVE'}\n"
-                    section += f"    FOR ALL\n"
-                    section += f"    TO {policy['roles'] or 'public'}\n"
+                    statement = f"\nCREATE POLICY {policy['policyname']} ON {current_table}\n"
+                    statement += f"    AS {'PERMISSIVE' if policy['permissive'] else 'RESTRICTIVE'}\n"
+                    statement += f"    FOR ALL\n"
+                    statement += f"    TO {roles}\n"
                     
                     if policy['qual']:
-                        section += f"    USING ({policy['qual']})\n"
+                        statement += f"    USING ({policy['qual']})\n"
                     if policy['with_check']:
-                        section += f"    WITH CHECK ({policy['with_check']})\n"
+                        statement += f"    WITH CHECK ({policy['with_check']})\n"
                     
-                    section += ";\n"
-                section += "\n"
+                    yield statement + ";\n"
+                yield "\n"
             else:
-                section += "-- No RLS policies found\n\n"
+                yield "-- No RLS policies found\n\n"
         except:
-            section += "-- Unable to extract RLS policies\n\n"
-        
-        return section
+            yield "-- Unable to extract RLS policies\n\n"
     
-    def _generate_footer(self) -> str:
+    def _generate_footer(self) -> Iterator[str]:
         """Generate SQL dump footer."""
-        return """
+        yield """
 -- ======================================================
 -- FINALIZATION
 -- ======================================================
@@ -438,6 +725,24 @@ SET session_replication_role = DEFAULT;
 def main():
     """Main execution."""
     
+    parser = argparse.ArgumentParser(description="Extract the complete Supabase schema through the REST SQL RPC.")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="maximum RPC calls in flight; above 1 uses the asyncio pipelined engine (default: 1)")
+    parser.add_argument("--install-snapshot-rpc", action="store_true",
+                        help="install or update the schema_snapshot() helper function, then exit")
+    parser.add_argument("--snapshot-rpc", action="store_true",
+                        help="extract the whole schema in a single schema_snapshot() call")
+    parser.add_argument("--metrics-report", metavar="PATH",
+                        help="write per-phase and per-query SQL call metrics as JSON to PATH")
+    parser.add_argument("--metrics-textfile", metavar="PATH",
+                        help="write the same metrics for the Prometheus node_exporter textfile collector to PATH")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile each phase with cProfile and tracemalloc; writes "
+                             "SUPABASE_COMPLETE_SCHEMA_DUMP.profile.pstats and .profile.txt")
+    parser.add_argument("--profile-top", type=int, default=DEFAULT_TOP, metavar="N",
+                        help=f"functions and allocation sites listed per phase with --profile (default: {DEFAULT_TOP})")
+    args = parser.parse_args()
+    
     # Load from .env.local
     from pathlib import Path
     env_file = Path('.env.local')
@@ -455,6 +760,8 @@ def main():
     
     supabase_url = env_vars.get('VITE_SUPABASE_URL')
     anon_key = env_vars.get('VITE_SUPABASE_ANON_KEY')
+    # schema_snapshot() is only executable by service_role.
+    service_role_key = env_vars.get('SUPABASE_SERVICE_ROLE_KEY')
     
     if not supabase_url or not anon_key:
         print("✗ Missing VITE_SUPABASE_URL or VITE_SUPABASE_ANON_KEY in .env.local")
@@ -463,10 +770,28 @@ def main():
     print(f"\nConnecting to: {supabase_url}")
     print()
     
-    extractor = SupabaseSQLExtractor(supabase_url, anon_key)
+    metrics = QueryMetrics("rest") if args.metrics_report or args.metrics_textfile else None
+    profiler = PhaseProfiler(args.profile_top) if args.profile else None
+    extractor = SupabaseSQLExtractor(supabase_url, anon_key, service_role_key, pool_size=max(args.concurrency, 1),
+                                     metrics=metrics, profiler=profiler)
+    
+    if args.install_snapshot_rpc:
+        extractor.install_schema_snapshot_rpc()
+        return
     
     # Extract schema
-    extractor.extract_complete_schema("SUPABASE_COMPLETE_SCHEMA_DUMP.sql")
+    if args.snapshot_rpc:
+        extractor.extract_complete_schema_snapshot("SUPABASE_COMPLETE_SCHEMA_DUMP.sql")
+    elif args.concurrency > 1:
+        extractor.extract_complete_schema_pipelined("SUPABASE_COMPLETE_SCHEMA_DUMP.sql", args.concurrency)
+    else:
+        extractor.extract_complete_schema("SUPABASE_COMPLETE_SCHEMA_DUMP.sql")
+    
+    if metrics:
+        print()
+        write_reports(metrics, args.metrics_report, args.metrics_textfile)
+    if profiler:
+        profiler.write("SUPABASE_COMPLETE_SCHEMA_DUMP.profile")
     
     print()
     print("Next steps:")
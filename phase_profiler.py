@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Extraction Phase Profiler
+Profiles an extraction phase by phase (catalog queries, rendering, writing)
+with cProfile and tracemalloc, without attaching external tools. Writes a
+cProfile stats file for the whole run, and a report with a per-phase summary
+table, each phase's hottest functions and its top allocation sites.
+"""
+
+import io
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import contextlib
+from typing import Dict, Any, Optional
+
+DEFAULT_TOP = 15
+STATS_SUFFIX = ".pstats"
+REPORT_SUFFIX = ".txt"
+
+
+class PhaseProfiler:
+    """Per-phase wall time, CPU time, memory and hot paths of one run.
+
+    A phase may be entered many times (once per table, say); its figures
+    accumulate. Phases do not nest: a phase entered inside another one, or
+    from another thread, is counted in the outer phase. cProfile only sees
+    the thread that entered the phase, so work handed to pool threads shows
+    up as wall time without CPU time ("wait"), like network round trips do.
+
+    Retained memory is the traced memory still allocated when each entry
+    ends, minus what it was when the entry began. Allocation sites are found
+    by diffing tracemalloc snapshots taken when the run moves from one phase
+    to another, so repeated entries of the same phase cost no snapshot; code
+    run between two phases is charged to the earlier one.
+    """
+
+    def __init__(self, top: int = DEFAULT_TOP):
+        self.top = top
+        self.phases = {}
+        self._active = None
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._snapshot = tracemalloc.take_snapshot()
+        self._snapshot_phase = None
+
+    def _phase_stats(self, name: str) -> Dict[str, Any]:
+        return self.phases.setdefault(name, {
+            "entries": 0,
+            "wall": 0.0,
+            "cpu": 0.0,
+            "peak": 0,
+            "retained": 0,
+            "allocations": {},
+            "profile": cProfile.Profile(),
+        })
+
+    def _attribute_allocations(self, next_phase: Optional[str]):
+        """Charge the memory allocated since the last phase change to the phase that ran."""
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        if self._snapshot_phase is not None:
+            allocations = self.phases[self._snapshot_phase]["allocations"]
+            for diff in snapshot.compare_to(self._snapshot, 'lineno'):
+                if diff.size_diff or diff.count_diff:
+                    frame = diff.traceback[0]
+                    site = f"{frame.filename}:{frame.lineno}"
+                    size, count = allocations.get(site, (0, 0))
+                    allocations[site] = (size + diff.size_diff, count + diff.count_diff)
+        self._snapshot = snapshot
+        self._snapshot_phase = next_phase
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Profile the enclosed block as (part of) phase `name`."""
+        with self._lock:
+            nested = self._active is not None
+            if not nested:
+                self._active = name
+        if nested:
+            yield
+            return
+
+        stats = self._phase_stats(name)
+        if self._snapshot_phase != name:
+            self._attribute_allocations(name)
+        tracemalloc.reset_peak()
+        traced = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        stats["profile"].enable()
+        try:
+            yield
+        finally:
+            stats["profile"].disable()
+            stats["entries"] += 1
+            stats["wall"] += time.perf_counter() - wall
+            stats["cpu"] += time.process_time() - cpu
+            current, peak = tracemalloc.get_traced_memory()
+            stats["peak"] = max(stats["peak"], peak)
+            stats["retained"] += current - traced
+            with self._lock:
+                self._active = None
+
+    def summary_table(self) -> str:
+        """Return the per-phase summary table."""
+        lines = [
+            f"{'Phase':<14}{'Entries':>9}{'Wall (s)':>10}{'CPU (s)':>10}{'Wait (s)':>10}"
+            f"{'Peak (MB)':>11}{'Retained (MB)':>15}",
+            "-" * 79,
+        ]
+        for name, stats in self.phases.items():
+            lines.append(f"{name:<14}{stats['entries']:>9}{stats['wall']:>10.3f}{stats['cpu']:>10.3f}"
+                         f"{max(stats['wall'] - stats['cpu'], 0):>10.3f}"
+                         f"{stats['peak'] / 1024 / 1024:>11.1f}{stats['retained'] / 1024 / 1024:>15.2f}")
+        lines.append("-" * 79)
+        lines.append(f"{'total run':<14}{'':>9}{time.perf_counter() - self._started:>10.3f}")
+        return "\n".join(lines)
+
+    def write(self, prefix: str) -> Dict[str, str]:
+        """Write <prefix>.pstats and <prefix>.txt, print the summary table; return the paths.
+
+        The stats file combines every phase and loads with `python -m pstats`
+        or any cProfile viewer.
+        """
+        self._attribute_allocations(None)
+        tracemalloc.stop()
+
+        stats_file = prefix + STATS_SUFFIX
+        report_file = prefix + REPORT_SUFFIX
+        profiled = [stats["profile"] for stats in self.phases.values() if stats["entries"]]
+        if profiled:
+            pstats.Stats(*profiled).dump_stats(stats_file)
+
+        table = self.summary_table()
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write("PER-PHASE SUMMARY\n")
+            f.write("Wait is wall time not spent on this process's CPU: network, disk and other threads.\n\n")
+            f.write(table + "\n")
+            for name, stats in self.phases.items():
+                f.write(f"\n{'=' * 79}\nPHASE {name}\n{'=' * 79}\n")
+
+                f.write(f"\nTop {self.top} allocation sites (net bytes allocated until the next phase began):\n")
+                sites = sorted(stats["allocations"].items(), key=lambda item: item[1][0], reverse=True)
+                for site, (size, count) in sites[:self.top]:
+                    f.write(f"  {size / 1024:>10.1f} KiB {count:>9,} blocks  {site}\n")
+
+                if stats["entries"]:
+                    f.write(f"\nTop {self.top} functions by own time:\n")
+                    stream = io.StringIO()
+                    pstats.Stats(stats["profile"], stream=stream).sort_stats("tottime").print_stats(self.top)
+                    f.write(stream.getvalue())
+
+        print("\n" + table)
+        print(f"✓ Profile stats: {stats_file}")
+        print(f"✓ Profile report: {report_file}")
+        return {"stats": stats_file, "report": report_file}
+
+
+def profile_phase(profiler: Optional[PhaseProfiler], name: str):
+    """Context manager profiling phase `name`, or doing nothing without a profiler."""
+    return profiler.phase(name) if profiler is not None else contextlib.nullcontext()
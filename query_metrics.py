@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Catalog Query Metrics
+Records every catalog query an extraction runs: its normalized SQL
+fingerprint, latency, rows returned and the dump phase it served (sequences,
+tables, views, functions, policies). At the end of a run the totals are
+written as a JSON report and as a Prometheus textfile-collector file, so
+scheduled extractions can be graphed and slow catalog queries stand out.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import contextlib
+from functools import partial
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+from psycopg2.extensions import cursor as TupleCursor
+
+DEFAULT_PHASE = "catalog"
+METRIC_PREFIX = "schema_extraction"
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query) -> str:
+    """Reduce a query to its shape: comments dropped, literals replaced by ?, whitespace collapsed.
+
+    Per-table catalog queries differ only in the table name literal, so
+    they all normalize to the same text.
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    query = _COMMENT.sub(" ", str(query))
+    query = _STRING.sub("?", query)
+    query = _NUMBER.sub("?", query)
+    return _WHITESPACE.sub(" ", query).strip().rstrip(";").rstrip()
+
+
+def query_fingerprint(normalized: str) -> str:
+    """Return a short stable identifier for a normalized query."""
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+class QueryMetrics:
+    """Per-fingerprint, per-phase totals of the catalog queries of one run.
+
+    Recording is thread-safe, so pooled workers can share one instance. The
+    current phase is shared as well: it is set around a whole dump section,
+    which concurrent workers of that section then inherit.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.started = time.time()
+        self.current_phase = DEFAULT_PHASE
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Attribute the queries run inside the block to phase `name`."""
+        previous = self.current_phase
+        self.current_phase = name
+        try:
+            yield
+        finally:
+            self.current_phase = previous
+
+    def record(self, query, seconds: float, rows: int, phase: str = None):
+        """Add one executed query to the totals."""
+        normalized = normalize_query(query)
+        fingerprint = query_fingerprint(normalized)
+        phase = phase or self.current_phase
+        with self._lock:
+            entry = self.entries.get((fingerprint, phase))
+            if entry is None:
+                entry = self.entries[(fingerprint, phase)] = {
+                    "fingerprint": fingerprint,
+                    "phase": phase,
+                    "query": normalized,
+                    "calls": 0,
+                    "seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "rows": 0,
+                }
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["rows"] += rows
+
+    def report(self) -> Dict[str, Any]:
+        """Return the run's totals per phase and per query fingerprint, slowest first."""
+        with self._lock:
+            queries = sorted((dict(entry) for entry in self.entries.values()),
+                             key=lambda entry: entry["seconds"], reverse=True)
+
+        phases = {}
+        for entry in queries:
+            totals = phases.setdefault(entry["phase"], {"queries": 0, "seconds": 0.0, "rows": 0})
+            totals["queries"] += entry["calls"]
+            totals["seconds"] += entry["seconds"]
+            totals["rows"] += entry["rows"]
+        for entry in queries:
+            entry["seconds"] = round(entry["seconds"], 6)
+            entry["max_seconds"] = round(entry["max_seconds"], 6)
+        for totals in phases.values():
+            totals["seconds"] = round(totals["seconds"], 6)
+
+        return {
+            "generated": datetime.now().isoformat(),
+            "source": self.source,
+            "duration_seconds": round(time.time() - self.started, 3),
+            "queries": sum(totals["queries"] for totals in phases.values()),
+            "query_seconds": round(sum(totals["seconds"] for totals in phases.values()), 6),
+            "rows": sum(totals["rows"] for totals in phases.values()),
+            "phases": phases,
+            "fingerprints": queries,
+        }
+
+
+class InstrumentedCursor(TupleCursor):
+    """Tuple cursor that records each query it executes in a QueryMetrics.
+
+    Create it with instrumented_cursor_factory(metrics); without metrics it
+    behaves like a plain cursor. Rows are tuples, for catalog_model records.
+    """
+
+    def __init__(self, *args, metrics: QueryMetrics = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            if self.metrics is not None:
+                # self.query is the statement as sent, parameters included.
+                self.metrics.record(self.query or query, time.perf_counter() - started,
+                                    max(self.rowcount, 0))
+
+
+def instrumented_cursor_factory(metrics: Optional[QueryMetrics]):
+    """Return a cursor_factory for connection.cursor() recording into `metrics`."""
+    if metrics is None:
+        return TupleCursor
+    return partial(InstrumentedCursor, metrics=metrics)
+
+
+def cursor_phase(cursor, name: str):
+    """Context manager attributing the cursor's queries to phase `name`, if it is instrumented."""
+    metrics = getattr(cursor, 'metrics', None)
+    return metrics.phase(name) if metrics is not None else contextlib.nullcontext()
+
+
+def in_phase(metrics: Optional[QueryMetrics], name: str, chunks: Iterable[str]) -> Iterator[str]:
+    """Iterate a lazily generated dump section with its queries attributed to phase `name`."""
+    if metrics is None:
+        yield from chunks
+        return
+    iterator = iter(chunks)
+    while True:
+        with metrics.phase(name):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+def _label_value(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + "}"
+
+
+def prometheus_text(report: Dict[str, Any]) -> str:
+    """Render a report in the Prometheus text exposition format.
+
+    Every metric is a gauge describing the last run, as the textfile
+    collector re-exports the file until the next run replaces it.
+    """
+    source = report["source"]
+    families = [
+        ("duration_seconds", "Wall time of the last schema extraction.",
+         [(_labels(source=source), report["duration_seconds"])]),
+        ("last_run_timestamp_seconds", "Unix time the last schema extraction finished.",
+         [(_labels(source=source), round(time.time(), 3))]),
+        ("queries", "Catalog queries run by the last extraction, by phase.",
+         [(_labels(source=source, phase=phase), totals["queries"])
+          for phase, totals in report["phases"].items()]),
+        ("query_seconds", "Time spent in catalog queries by the last extraction, by phase.",
+         [(_labels(source=source, phase=phase), totals["seconds"])
+          for phase, totals in report["phases"].items()]),
+        ("rows", "Rows returned by catalog queries of the last extraction, by phase.",
+         [(_labels(source=source, phase=phase), totals["rows"])
+          for phase, totals in report["phases"].items()]),
+        ("fingerprint_calls", "Executions of each catalog query shape in the last extraction.",
+         [(_labels(source=source, phase=entry["phase"], fingerprint=entry["fingerprint"]), entry["calls"])
+          for entry in report["fingerprints"]]),
+        ("fingerprint_seconds", "Total time of each catalog query shape in the last extraction.",
+         [(_labels(source=source, phase=entry["phase"], fingerprint=entry["fingerprint"]), entry["seconds"])
+          for entry in report["fingerprints"]]),
+        ("fingerprint_max_seconds", "Slowest single execution of each catalog query shape.",
+         [(_labels(source=source, phase=entry["phase"], fingerprint=entry["fingerprint"]), entry["max_seconds"])
+          for entry in report["fingerprints"]]),
+    ]
+
+    lines = []
+    for name, help_text, samples in families:
+        metric = f"{METRIC_PREFIX}_{name}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        lines.extend(f"{metric}{labels} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomically(path: str, text: str):
+    """Write through a temporary file and rename it into place.
+
+    The textfile collector may read the file at any moment and must never
+    see it half written.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def write_reports(metrics: QueryMetrics, report_file: str = None, textfile: str = None,
+                  slowest: int = 3) -> Dict[str, Any]:
+    """Write the JSON report and/or the Prometheus textfile; print the slowest queries."""
+    report = metrics.report()
+    if report_file:
+        _write_atomically(report_file, json.dumps(report, indent=2) + "\n")
+        print(f"✓ Query metrics report: {report_file}")
+    if textfile:
+        _write_atomically(textfile, prometheus_text(report))
+        print(f"✓ Prometheus metrics: {textfile}")
+
+    print(f"✓ {report['queries']} catalog queries, {report['query_seconds']:.2f} s, {report['rows']:,} rows")
+    for entry in report["fingerprints"][:slowest]:
+        print(f"    • {entry['fingerprint']} [{entry['phase']}] {entry['calls']} calls, "
+              f"{entry['seconds']:.3f} s (max {entry['max_seconds']:.3f} s): {entry['query'][:60]}")
+    return report
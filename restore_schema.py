@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Supabase Schema Restore
+Loads a schema dump, plus the per-table COPY files written with --data-dir,
+into a target database. Tables are created without their keys, data is copied
+in foreign-key order with several connections per wave, and primary keys,
+unique constraints, indexes and foreign keys are built once the data is in.
+Directory-format dumps can also be restored in part: only the selected
+objects and the objects they depend on are read. Dumps and data files
+compressed with --compress (gzip or xz) are decompressed as they are read.
+"""
+
+import io
+import re
+import json
+import time
+import argparse
+import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Iterator, Set, Tuple
+from catalog_model import quote_identifier
+from dump_writer import DEFAULT_BUFFER_SIZE, open_dump
+from data_export import DEFAULT_SCHEMA, MANIFEST_FILE
+from dump_directory import is_directory_dump, read_object, read_toc, select_objects
+from schema_graph import topological_waves
+from sql_splitter import META_COMMAND, iter_statements
+
+DEFAULT_RESTORE_WORKERS = 4
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE (?:IF NOT EXISTS )?(\S+) \(", re.IGNORECASE)
+_TABLE_KEY = re.compile(r"^\s*(?:CONSTRAINT (\S+) )?(PRIMARY KEY|UNIQUE|FOREIGN KEY) (.*?),?$", re.IGNORECASE)
+_ALTER_KEY = re.compile(r"ALTER TABLE (?:ONLY )?(\S+)\s+ADD (?:CONSTRAINT \S+\s+)?(?:PRIMARY KEY|UNIQUE)\b",
+                        re.IGNORECASE)
+_ALTER_FOREIGN_KEY = re.compile(r"ALTER TABLE (?:ONLY )?(\S+)\s+ADD CONSTRAINT (\S+)\s+FOREIGN KEY (.*)$",
+                                re.IGNORECASE | re.DOTALL)
+_REFERENCES = re.compile(r"\((.*?)\)\s+REFERENCES\s+(\S+)\s*\((.*?)\)(.*)$", re.IGNORECASE | re.DOTALL)
+_SEARCH_PATH = re.compile(r"SET search_path\s*(?:TO|=)\s*(.+)$", re.IGNORECASE)
+# One schema of a search_path list: a quoted identifier (quotes doubled inside) or a bare name.
+_SEARCH_PATH_NAME = re.compile(r'"((?:[^"]|"")+)"|([^\s,"]+)')
+
+# Statements that only make sense for psql replays of the dump: the restore
+# orders the loads itself, and session_replication_role needs a superuser.
+_SKIPPED = ("SET SESSION_REPLICATION_ROLE",)
+
+
+def plan_restore(statements: Iterator[str]) -> Dict[str, Any]:
+    """Sort dump statements into the phases of a restore.
+
+    CREATE TABLE statements lose their PRIMARY KEY, UNIQUE and FOREIGN KEY
+    clauses, which come back as ALTER TABLE statements after the data, along
+    with the dump's own ALTER TABLE ... ADD key statements. The foreign
+    keys also give the table dependency graph used to order the loads.
+    Index definitions are deferred likewise. The dump's SET search_path,
+    if any, gives the schema its unqualified names belong to.
+    """
+    plan = {
+        'search_path': [DEFAULT_SCHEMA],
+        'pre_data': [],
+        'tables': [],
+        'references': {},
+        'keys': [],
+        'indexes': [],
+        'foreign_keys': [],
+        'skipped': 0,
+    }
+    foreign_keys = {}
+
+    def add_foreign_key(table, name, definition):
+        # Multi-column keys are rendered one line per column; merge them by name.
+        columns, ref_table, ref_columns, actions = _REFERENCES.match(definition).groups()
+        fk = foreign_keys.setdefault(name, {
+            'table': table, 'columns': [], 'ref_table': ref_table, 'ref_columns': [],
+            'actions': ''.join(f" {word}" for word in actions.split()),
+        })
+        fk['columns'].append(columns)
+        fk['ref_columns'].append(ref_columns)
+        plan['references'].setdefault(table, set()).add(ref_table)
+
+    for statement in statements:
+        upper = statement.upper()
+        if upper.startswith(_SKIPPED):
+            plan['skipped'] += 1
+            continue
+
+        search_path = _SEARCH_PATH.match(statement)
+        if search_path:
+            plan['search_path'] = [quoted.replace('""', '"') or bare
+                                   for quoted, bare in _SEARCH_PATH_NAME.findall(search_path.group(1))]
+
+        if re.match(r"CREATE (UNIQUE )?INDEX", upper):
+            table = re.search(r" ON (?:ONLY )?(\S+)", statement).group(1).split('.')[-1]
+            # The indexes backing UNIQUE constraints are listed too; the key already built them.
+            if "IF NOT EXISTS" not in upper:
+                statement = re.sub(r"^(CREATE (?:UNIQUE )?INDEX) ", r"\1 IF NOT EXISTS ", statement, flags=re.IGNORECASE)
+            plan['indexes'].append((table, statement))
+            continue
+
+        alter_key = _ALTER_KEY.match(statement)
+        if alter_key:
+            plan['keys'].append((alter_key.group(1), statement))
+            continue
+
+        alter_foreign_key = _ALTER_FOREIGN_KEY.match(statement)
+        if alter_foreign_key:
+            add_foreign_key(*alter_foreign_key.groups())
+            continue
+
+        create_table = _CREATE_TABLE.match(statement)
+        if not create_table:
+            plan['pre_data'].append(statement)
+            continue
+
+        table = create_table.group(1)
+        plan['tables'].append(table)
+        plan['references'].setdefault(table, set())
+        kept = []
+        for line in statement.split('\n'):
+            key = _TABLE_KEY.match(line)
+            if not key:
+                kept.append(line)
+                continue
+
+            name, kind, definition = key.group(1), key.group(2).upper(), key.group(3).strip()
+            if kind != 'FOREIGN KEY':
+                constraint = f"CONSTRAINT {name} " if name else ""
+                plan['keys'].append((table, f"ALTER TABLE {table} ADD {constraint}{kind} {definition}"))
+                continue
+
+            add_foreign_key(table, name, definition)
+
+        # Drop the separator left dangling by the removed clauses.
+        body = '\n'.join(kept)
+        plan['pre_data'].append(re.sub(r",\s*\n\s*\)$", "\n)", body))
+
+    for name, fk in foreign_keys.items():
+        plan['foreign_keys'].append((fk['table'], (
+            f"ALTER TABLE {fk['table']} ADD CONSTRAINT {name} "
+            f"FOREIGN KEY ({', '.join(fk['columns'])}) "
+            f"REFERENCES {fk['ref_table']} ({', '.join(fk['ref_columns'])}){fk['actions']}"
+        )))
+
+    return plan
+
+
+def _run_statement(pool, statement: str) -> Tuple[str, Exception]:
+    """Run one statement on a pooled autocommit connection; return it and any error."""
+    conn = pool.getconn()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(statement)
+        return statement, None
+    except psycopg2.Error as e:
+        return statement, e
+    finally:
+        pool.putconn(conn)
+
+
+def run_parallel(pool, workers: int, statements: List[str], label: str) -> int:
+    """Run independent statements concurrently; return the number that failed.
+
+    Deadlocks between concurrent ALTER TABLEs are retried one at a time.
+    """
+    failures = 0
+    retry = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for statement, error in executor.map(partial(_run_statement, pool), statements):
+            if isinstance(error, psycopg2.errors.DeadlockDetected):
+                retry.append(statement)
+            elif error:
+                failures += 1
+                print(f"⚠ {label}: {str(error).strip().splitlines()[0]}")
+
+    for statement in retry:
+        _, error = _run_statement(pool, statement)
+        if error:
+            failures += 1
+            print(f"⚠ {label}: {str(error).strip().splitlines()[0]}")
+
+    return failures
+
+
+def load_table(pool, table_name: str, path: Path, schema: str = DEFAULT_SCHEMA) -> Dict[str, Any]:
+    """Stream one COPY file, plain or compressed, into its table on a pooled connection."""
+    started = time.perf_counter()
+    conn = pool.getconn()
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor, open_dump(str(path)) as f:
+            copy = sql.SQL("COPY {} FROM STDIN").format(sql.Identifier(schema, table_name))
+            cursor.copy_expert(copy, f, size=DEFAULT_BUFFER_SIZE)
+            rows = cursor.rowcount
+        return {"table": table_name, "rows": rows, "seconds": time.perf_counter() - started}
+    finally:
+        pool.putconn(conn)
+
+
+def reset_sequences(conn, schema: str = DEFAULT_SCHEMA) -> int:
+    """Move every nextval() default's sequence past the loaded rows; return how many."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+        SELECT c.relname AS table_name, a.attname AS column_name,
+            substring(pg_get_expr(d.adbin, d.adrelid) from 'nextval\\(''([^'']+)''') AS sequence_name
+        FROM pg_attrdef d
+        JOIN pg_class c ON c.oid = d.adrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum
+        WHERE n.nspname = %s
+        AND pg_get_expr(d.adbin, d.adrelid) LIKE 'nextval(%%'
+        """, (schema,))
+        defaults = cursor.fetchall()
+        for table_name, column_name, sequence_name in defaults:
+            cursor.execute(sql.SQL("SELECT setval(%s, coalesce(max({}), 0) + 1, false) FROM {}").format(
+                sql.Identifier(column_name), sql.Identifier(schema, table_name)), (sequence_name,))
+    return len(defaults)
+
+
+def existing_dependencies(db_url: str, dump_path: str, objects: Iterable[str]) -> Set[str]:
+    """Return the ids of the selected objects' dependencies that already exist in the target.
+
+    A dependency's file starts with DROP ... CASCADE, which would take down
+    objects nobody asked to restore; the ones already there are kept as they
+    are. Keys, foreign keys, policies and data go with their table.
+    """
+    toc = read_toc(dump_path)
+    dependencies = [entry for entry in select_objects(toc, objects) if entry.get('dependency')]
+    if not dependencies:
+        return set()
+
+    conn = psycopg2.connect(db_url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+            SELECT 'functions', p.proname
+            FROM pg_proc p
+            JOIN pg_namespace n ON n.oid = p.pronamespace
+            WHERE n.nspname = %(schema)s AND p.proname = ANY(%(names)s)
+            UNION
+            SELECT 'relations', c.relname
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = %(schema)s AND c.relname = ANY(%(names)s)
+            """, {'schema': toc.get('schema', DEFAULT_SCHEMA),
+                  'names': sorted({entry['name'] for entry in dependencies})})
+            existing = set(cursor.fetchall())
+    finally:
+        conn.close()
+
+    return {
+        entry['id'] for entry in dependencies
+        if ("functions" if entry['kind'] == "functions" else "relations", entry['name']) in existing
+    }
+
+
+def dump_statements(dump_path: str, objects: Iterable[str] = None, skipped: Set[str] = frozenset()) -> Iterator[str]:
+    """Yield the SQL statements of a dump file, or of a directory dump's objects.
+
+    `objects` selects objects of a directory dump by id or name (see
+    dump_directory.select_objects); only their files are read, less the
+    dependencies listed in `skipped`.
+    """
+    if not is_directory_dump(dump_path):
+        if objects:
+            raise ValueError(f"{dump_path} is not a directory dump; objects can only be selected from one")
+        with open_dump(dump_path) as f:
+            for statement in iter_statements(f):
+                if statement.kind != META_COMMAND:
+                    yield statement.text
+        return
+
+    toc = read_toc(dump_path)
+    entries = select_objects(toc, objects) if objects else toc['objects']
+    print(f"✓ {len(entries)} of {len(toc['objects'])} objects selected from {dump_path}/")
+    if skipped:
+        print(f"✓ {len(skipped)} dependencies already in the target, left as they are: {', '.join(sorted(skipped))}")
+        entries = [entry for entry in entries if entry['id'] not in skipped]
+    for entry in entries:
+        for statement in iter_statements(io.BytesIO(read_object(dump_path, entry))):
+            if statement.kind != META_COMMAND:
+                yield statement.text
+
+
+def restore(db_url: str, dump_file: str, data_dir: str = None, workers: int = DEFAULT_RESTORE_WORKERS,
+            objects: Iterable[str] = None) -> bool:
+    """Restore the dump (or its selected objects), and the data in data_dir if given, into db_url."""
+    skipped = existing_dependencies(db_url, dump_file, objects) if objects and is_directory_dump(dump_file) else set()
+    plan = plan_restore(dump_statements(dump_file, objects, skipped))
+    schema = plan['search_path'][0]
+    print(f"✓ Parsed {dump_file}: {len(plan['tables'])} tables, {len(plan['indexes'])} indexes, "
+          f"{len(plan['keys'])} keys, {len(plan['foreign_keys'])} foreign keys (schema {schema})")
+
+    failures = 0
+    started = time.perf_counter()
+    # Every connection resolves the dump's unqualified names in its schema,
+    # not only the one that runs the SET search_path of the pre-data.
+    # libpq splits options on spaces unless backslash-escaped.
+    search_path = ','.join(quote_identifier(name) for name in plan['search_path'])
+    options = "-c search_path=" + search_path.replace('\\', '\\\\').replace(' ', '\\ ')
+    conn = psycopg2.connect(db_url, options=options)
+    conn.autocommit = True
+    pool = ThreadedConnectionPool(1, workers, db_url, options=options)
+    try:
+        # Pre-data: sequences, tables, functions, views and policies in dump order.
+        phase = time.perf_counter()
+        with conn.cursor() as cursor:
+            cursor.execute("SET check_function_bodies = off")
+            for statement in plan['pre_data']:
+                try:
+                    cursor.execute(statement)
+                except psycopg2.Error as e:
+                    failures += 1
+                    print(f"⚠ Schema: {str(e).strip().splitlines()[0]}")
+        print(f"✓ Schema created in {time.perf_counter() - phase:.2f} s")
+
+        # Data: parents before children, tables of a wave in parallel.
+        if data_dir:
+            phase = time.perf_counter()
+            with open(Path(data_dir) / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                files = {entry['table']: Path(data_dir) / entry['file'] for entry in json.load(f)['tables']}
+            tables = [table for table in plan['tables'] if table in files]
+            waves = topological_waves(tables, plan['references'])
+            rows = 0
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for number, wave in enumerate(waves, 1):
+                    futures = [executor.submit(load_table, pool, table, files[table], schema) for table in wave]
+                    for future in futures:
+                        try:
+                            loaded = future.result()
+                        except psycopg2.Error as e:
+                            failures += 1
+                            print(f"⚠ Data: {str(e).strip().splitlines()[0]}")
+                            continue
+                        rows += loaded['rows']
+                        print(f"    • wave {number}: {loaded['table']} "
+                              f"({loaded['rows']:,} rows in {loaded['seconds']:.2f} s)")
+            print(f"✓ Loaded {rows:,} rows in {len(waves)} waves in {time.perf_counter() - phase:.2f} s")
+            print(f"✓ Reset {reset_sequences(conn, schema)} sequences")
+
+        # Post-data: keys first, since foreign keys need the referenced unique indexes.
+        phase = time.perf_counter()
+        failures += run_parallel(pool, workers, [s for _, s in plan['keys']], "Key")
+        failures += run_parallel(pool, workers, [s for _, s in plan['indexes']], "Index")
+        failures += run_parallel(pool, workers, [s for _, s in plan['foreign_keys']], "Foreign key")
+        print(f"✓ Keys, indexes and foreign keys built in {time.perf_counter() - phase:.2f} s")
+    finally:
+        pool.closeall()
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    if failures:
+        print(f"\n⚠ Restore finished in {elapsed:.2f} s with {failures} failed statements")
+        return False
+    print(f"\n✓ Restore complete in {elapsed:.2f} s")
+    return True
+
+
+def main():
+    """Main execution."""
+    parser = argparse.ArgumentParser(description="Restore a schema dump and its exported data in parallel.")
+    parser.add_argument("dump_file",
+                        help="SQL dump (plain, .gz or .xz), or directory-format dump, written by one of the extractors")
+    parser.add_argument("--database-url", required=True,
+                        help="target database; the dump drops and recreates its tables there")
+    parser.add_argument("--data-dir", metavar="DIR",
+                        help="directory of per-table COPY files and manifest.json written with --data-dir")
+    parser.add_argument("--workers", type=int, default=DEFAULT_RESTORE_WORKERS,
+                        help=f"connections used to load tables and build indexes (default: {DEFAULT_RESTORE_WORKERS})")
+    parser.add_argument("--object", action="append", dest="objects", metavar="NAME",
+                        help="restore only this object of a directory dump (an id such as tables/users, or a "
+                             "name such as users for all of its objects) and what it depends on; repeatable")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("SUPABASE SCHEMA RESTORE")
+    print("=" * 70 + "\n")
+
+    try:
+        return restore(args.database_url, args.dump_file, args.data_dir, max(args.workers, 1), args.objects)
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = main()
+    exit(0 if success else 1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Schema Dependency Graph
+Orders tables by their foreign keys so that referenced tables come before the
+tables that reference them. Reference cycles are found and cut; the foreign
+keys on the cut edges have to be added with ALTER TABLE once every table of
+the cycle exists.
+"""
+
+from typing import List, Dict, Set, Tuple, Iterable, Any
+
+
+def dependency_graph(tables: Iterable[str], references: Dict[str, Iterable[str]]) -> Dict[str, Set[str]]:
+    """Return table -> referenced tables, restricted to `tables`.
+
+    Self-references and references to tables outside the set are dropped,
+    since they never constrain the order.
+    """
+    tables = list(tables)
+    known = set(tables)
+    return {
+        table: {ref for ref in references.get(table, ()) if ref in known and ref != table}
+        for table in tables
+    }
+
+
+def find_cycles(graph: Dict[str, Set[str]]) -> List[List[str]]:
+    """Return the strongly connected components of more than one table.
+
+    Tarjan's algorithm, iterative so that long reference chains do not hit
+    the recursion limit. Tables in each component keep the graph's order.
+    """
+    position = {table: i for i, table in enumerate(graph)}
+    index = {}
+    lowlink = {}
+    stack = []
+    on_stack = set()
+    cycles = []
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root], key=position.get)))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+
+        while work:
+            table, refs = work[-1]
+            for ref in refs:
+                if ref not in index:
+                    index[ref] = lowlink[ref] = len(index)
+                    stack.append(ref)
+                    on_stack.add(ref)
+                    work.append((ref, iter(sorted(graph[ref], key=position.get))))
+                    break
+                if ref in on_stack:
+                    lowlink[table] = min(lowlink[table], index[ref])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[table])
+                if lowlink[table] == index[table]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == table:
+                            break
+                    if len(component) > 1:
+                        cycles.append(sorted(component, key=position.get))
+
+    return cycles
+
+
+def break_cycles(graph: Dict[str, Set[str]]) -> Tuple[Dict[str, Set[str]], Set[Tuple[str, str]]]:
+    """Cut every reference cycle; return the acyclic graph and the cut (table, referenced) edges.
+
+    Each cycle is walked depth-first from its first table, and only the
+    references that lead back to a table still on the walk are cut, which
+    keeps the number of deferred foreign keys low.
+    """
+    position = {table: i for i, table in enumerate(graph)}
+    acyclic = {table: set(refs) for table, refs in graph.items()}
+    deferred = set()
+
+    for component in find_cycles(graph):
+        members = set(component)
+        on_walk = set()
+        visited = set()
+        for root in component:
+            if root in visited:
+                continue
+            visited.add(root)
+            on_walk.add(root)
+            work = [(root, iter(sorted(graph[root] & members, key=position.get)))]
+            while work:
+                table, refs = work[-1]
+                for ref in refs:
+                    if ref in on_walk:
+                        acyclic[table].discard(ref)
+                        deferred.add((table, ref))
+                    elif ref not in visited:
+                        visited.add(ref)
+                        on_walk.add(ref)
+                        work.append((ref, iter(sorted(graph[ref] & members, key=position.get))))
+                        break
+                else:
+                    on_walk.discard(table)
+                    work.pop()
+
+    return acyclic, deferred
+
+
+def topological_waves(tables: Iterable[str], references: Dict[str, Iterable[str]]) -> List[List[str]]:
+    """Group tables into waves; every table only references tables of earlier waves.
+
+    Tables within a wave are independent of each other and can be processed
+    concurrently; they keep the order they were given in. Reference cycles
+    are cut first (see break_cycles).
+    """
+    graph, _ = break_cycles(dependency_graph(tables, references))
+    position = {table: i for i, table in enumerate(graph)}
+    pending = {table: len(refs) for table, refs in graph.items()}
+    dependents = {table: [] for table in graph}
+    for table, refs in graph.items():
+        for ref in refs:
+            dependents[ref].append(table)
+
+    waves = []
+    wave = [table for table in graph if not pending[table]]
+    while wave:
+        waves.append(wave)
+        ready = []
+        for table in wave:
+            for dependent in dependents[table]:
+                pending[dependent] -= 1
+                if not pending[dependent]:
+                    ready.append(dependent)
+        wave = sorted(ready, key=position.get)
+
+    return waves
+
+
+def order_tables(tables: Iterable[str], references: Dict[str, Iterable[str]]) -> Dict[str, Any]:
+    """Plan the creation order of tables from their foreign key references.
+
+    Returns the waves, each table's dependency level (its wave number, from
+    0), the reference cycles found, and the (table, referenced) edges cut to
+    break them, whose foreign keys must be deferred.
+    """
+    graph = dependency_graph(tables, references)
+    _, deferred = break_cycles(graph)
+    waves = topological_waves(graph, graph)
+    return {
+        'waves': waves,
+        'levels': {table: level for level, wave in enumerate(waves) for table in wave},
+        'cycles': find_cycles(graph),
+        'deferred': deferred,
+    }
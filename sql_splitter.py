@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Streaming SQL Statement Splitter
+Splits a SQL dump into statements while reading it block by block, in one
+linear pass that holds no more than the current statement. Semicolons inside
+quoted strings, quoted identifiers, dollar-quoted function bodies and
+comments do not end a statement, and the data of COPY ... FROM stdin blocks
+is skipped rather than read as SQL. Every statement comes out typed
+(CREATE TABLE, CREATE FUNCTION, ALTER TABLE, ...) with its byte offsets in
+the file, so tools can copy or re-read exact ranges of the dump.
+"""
+
+import io
+import re
+from typing import BinaryIO, Iterator, Optional, Union
+
+# Bytes read from the dump at a time.
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+# Kind of a psql meta-command line (\connect, \set, ...).
+META_COMMAND = "PSQL"
+
+# What can change the tokenizer's state inside a statement; everything in
+# between is skipped by the regex engine rather than byte by byte in Python.
+_SPECIAL = re.compile(rb"""[;'"$]|--|/\*""")
+_BLOCK_COMMENT = re.compile(rb"/\*|\*/")
+_E_STRING_SPECIAL = re.compile(rb"['\\]")
+_DOLLAR_QUOTE = re.compile(rb"\$(?:[A-Za-z_\x80-\xff][A-Za-z_0-9\x80-\xff]*)?\$")
+_DOLLAR_PREFIX = re.compile(rb"\$[A-Za-z_0-9\x80-\xff]*")
+# Whitespace and whole comment lines between statements.
+_BLANK = re.compile(rb"(?:\s+|--[^\n]*\n)*")
+_IDENTIFIER_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_$") | frozenset(
+    range(0x80, 0x100))
+_COPY_FROM_STDIN = re.compile(r"\bFROM\s+STDIN\b", re.IGNORECASE)
+_WORD = re.compile(r"\w+")
+
+# Words between CREATE and the object type, dropped from the kind.
+_CREATE_MODIFIERS = {"OR", "REPLACE", "UNIQUE", "TEMP", "TEMPORARY", "UNLOGGED", "GLOBAL", "LOCAL",
+                     "CONSTRAINT", "RECURSIVE", "TRUSTED", "PROCEDURAL", "DEFAULT"}
+# Object types spelled with two words.
+_TWO_WORD_TYPES = {"MATERIALIZED", "EVENT", "FOREIGN", "TEXT", "ACCESS", "USER", "OPERATOR"}
+
+
+class Statement:
+    """One statement of a dump.
+
+    start and end are the byte offsets of the statement in the file, from
+    its first keyword through its semicolon; for COPY ... FROM stdin they
+    also cover the data and its \\. line, and data_start and data_end the
+    data rows alone. text has neither the semicolon nor the data. A psql
+    meta-command (kind META_COMMAND) spans its line.
+    """
+
+    __slots__ = ('kind', 'text', 'start', 'end', 'data_start', 'data_end')
+
+    def __init__(self, kind: str, text: str, start: int, end: int,
+                 data_start: Optional[int] = None, data_end: Optional[int] = None):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+        self.data_start = data_start
+        self.data_end = data_end
+
+    def __repr__(self):
+        return f"Statement({self.kind!r}, {self.start}-{self.end}, {self.text[:40]!r})"
+
+
+def statement_kind(text: str) -> str:
+    """Return the type of a statement: "CREATE TABLE", "ALTER TABLE", "COMMENT ON", "SET", ...
+
+    CREATE modifiers are dropped, so CREATE OR REPLACE FUNCTION is a
+    CREATE FUNCTION and CREATE UNIQUE INDEX a CREATE INDEX.
+    """
+    words = [word.upper() for word in _WORD.findall(text, 0, 80)[:6]]
+    if not words:
+        return ""
+    command = words[0]
+    if command in ("CREATE", "ALTER", "DROP") and len(words) > 1:
+        rest = words[1:]
+        if command == "CREATE":
+            while len(rest) > 1 and rest[0] in _CREATE_MODIFIERS:
+                rest = rest[1:]
+        object_type = rest[0]
+        if object_type in _TWO_WORD_TYPES and len(rest) > 1:
+            object_type += " " + rest[1]
+        return f"{command} {object_type}"
+    if command == "COMMENT" and words[1:2] == ["ON"]:
+        return "COMMENT ON"
+    return command
+
+
+class Tokenizer:
+    """Statement scanner over a binary stream.
+
+    buf holds the file from offset base on. Scanning a statement only
+    appends to it; what lies before the current statement is dropped
+    between statements, once it outgrows a block, so the buffer stays
+    within about one block plus one statement. The _skip_* methods are
+    shared with other scanners of the dump (diagnose_extraction's
+    validator), so quoted text and comments end where they end here.
+    """
+
+    def __init__(self, f: BinaryIO, block_size: int):
+        self.f = f
+        self.block_size = block_size
+        self.buf = bytearray()
+        self.base = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Append the next block; return False at end of file."""
+        if self.eof:
+            return False
+        block = self.f.read(self.block_size)
+        if not block:
+            self.eof = True
+            return False
+        self.buf += block
+        return True
+
+    def _available(self, i: int, n: int) -> bool:
+        """Make sure buf[i:i + n] is read if the file has it; return whether it is."""
+        while len(self.buf) < i + n:
+            if not self._fill():
+                return False
+        return True
+
+    def _drop(self, i: int) -> int:
+        """Drop buf[:i] if that frees more than a block; return the new index of i."""
+        if i > self.block_size:
+            del self.buf[:i]
+            self.base += i
+            return 0
+        return i
+
+    def _find(self, needle: bytes, i: int) -> int:
+        """Index of the next needle at or after i, reading on as needed; -1 if the file has none."""
+        while True:
+            found = self.buf.find(needle, i)
+            if found >= 0:
+                return found
+            i = max(i, len(self.buf) - len(needle) + 1)
+            if not self._fill():
+                return -1
+
+    def _skip_line(self, i: int) -> int:
+        """Index just past the end of the line containing i."""
+        newline = self._find(b"\n", i)
+        return len(self.buf) if newline < 0 else newline + 1
+
+    def _skip_block_comment(self, i: int) -> int:
+        """Index just past the (possibly nested) block comment opening at i."""
+        depth = 0
+        while True:
+            match = _BLOCK_COMMENT.search(self.buf, i)
+            if match is None:
+                i = max(i, len(self.buf) - 1)
+                if not self._fill():
+                    return len(self.buf)
+                continue
+            i = match.end()
+            depth += 1 if match.group() == b"/*" else -1
+            if depth == 0:
+                return i
+
+    def _skip_quoted(self, i: int, quote: bytes) -> int:
+        """Index just past the string or identifier opening at i; doubled quotes are escapes."""
+        i += 1
+        while True:
+            end = self._find(quote, i)
+            if end < 0:
+                return len(self.buf)
+            if self._available(end + 1, 1) and self.buf[end + 1:end + 2] == quote:
+                i = end + 2
+                continue
+            return end + 1
+
+    def _skip_escape_string(self, i: int) -> int:
+        """Index just past the E'...' string opening at i, where backslashes escape."""
+        i += 1
+        while True:
+            match = _E_STRING_SPECIAL.search(self.buf, i)
+            if match is None:
+                # i may already be past the buffer, after a backslash ending it.
+                i = max(i, len(self.buf))
+                if not self._fill():
+                    return len(self.buf)
+                continue
+            end = match.start()
+            if match.group() == b"\\":
+                i = end + 2
+            elif self._available(end + 1, 1) and self.buf[end + 1:end + 2] == b"'":
+                i = end + 2
+            else:
+                return end + 1
+
+    def _skip_string(self, i: int) -> int:
+        """Index just past the string opening at i, an E'...' string if an E prefix precedes the quote."""
+        escape = i > 0 and self.buf[i - 1] in b"eE" and (i < 2 or self.buf[i - 2] not in _IDENTIFIER_BYTES)
+        return self._skip_escape_string(i) if escape else self._skip_quoted(i, b"'")
+
+    def _skip_dollar_quote(self, i: int) -> int:
+        """Index just past the dollar-quoted body opening at i, or i + 1 for a lone $."""
+        if i > 0 and self.buf[i - 1] in _IDENTIFIER_BYTES:
+            return i + 1
+        while True:
+            tag = _DOLLAR_QUOTE.match(self.buf, i)
+            if tag is not None:
+                break
+            # The tag may continue past the buffer: $ followed by tag characters only.
+            if _DOLLAR_PREFIX.match(self.buf, i).end() < len(self.buf) or not self._fill():
+                return i + 1
+        tag = tag.group()
+        end = self._find(tag, i + len(tag))
+        return len(self.buf) if end < 0 else end + len(tag)
+
+    def _statement_start(self, i: int) -> int:
+        """Index of the next statement's first byte, past whitespace and comments; -1 at end of file."""
+        while True:
+            i = _BLANK.match(self.buf, i).end()
+            if len(self.buf) - i < 2 and self._fill():
+                continue
+            if i == len(self.buf):
+                return -1
+            if self.buf.startswith(b"--", i):
+                # A comment the buffer ends in the middle of.
+                i = self._skip_line(i)
+            elif self.buf.startswith(b"/*", i):
+                i = self._skip_block_comment(i)
+            else:
+                return i
+
+    def _statement_end(self, i: int) -> int:
+        """Index just past the semicolon ending the statement that starts at i (or end of file)."""
+        while True:
+            match = _SPECIAL.search(self.buf, i)
+            if match is None:
+                # A two-byte token may straddle the blocks.
+                i = max(i, len(self.buf) - 1)
+                if not self._fill():
+                    return len(self.buf)
+                continue
+            j = match.start()
+            token = match.group()
+            if token == b";":
+                return j + 1
+            if token == b"'":
+                i = self._skip_string(j)
+            elif token == b'"':
+                i = self._skip_quoted(j, b'"')
+            elif token == b"$":
+                i = self._skip_dollar_quote(j)
+            elif token == b"--":
+                i = self._skip_line(j)
+            else:
+                i = self._skip_block_comment(j)
+
+    def _is_terminator(self, i: int) -> bool:
+        """Whether the line starting at i is the \\. line ending COPY data."""
+        self._available(i, 3)
+        return self.buf[i:i + 2] == b"\\." and self.buf[i + 2:i + 3] in (b"\n", b"\r", b"")
+
+    def _copy_data_end(self, i: int):
+        """Skip COPY data from line start i; return (data end, index past the \\. line).
+
+        Rows are searched for the terminator a buffer at a time, and dropped
+        once searched, so they are never held.
+        """
+        line = i
+        while True:
+            if self._is_terminator(line):
+                return line, self._skip_line(line)
+            search = line
+            found = self.buf.find(b"\n\\.", search)
+            while found < 0:
+                # Only the last 2 bytes can start a terminator; drop the rest and read on.
+                search = self._drop(max(len(self.buf) - 2, search))
+                if not self._fill():
+                    return len(self.buf), len(self.buf)
+                found = self.buf.find(b"\n\\.", search)
+            line = found + 1
+
+    def statements(self) -> Iterator[Statement]:
+        i = 0
+        while True:
+            i = self._statement_start(i)
+            if i < 0:
+                return
+            i = self._drop(i)
+            start = self.base + i
+
+            if self.buf[i:i + 1] == b"\\":
+                end = self._skip_line(i)
+                text = self.buf[i:end].decode('utf-8').strip()
+                yield Statement(META_COMMAND, text, start, self.base + end)
+                i = end
+                continue
+
+            end = self._statement_end(i)
+            text = self.buf[i:end].decode('utf-8').strip().rstrip(";").rstrip()
+            if not text:
+                # A stray semicolon, as in "...;;": an empty statement.
+                i = end
+                continue
+            kind = statement_kind(text)
+            statement = Statement(kind, text, start, self.base + end)
+
+            if kind == "COPY" and _COPY_FROM_STDIN.search(text):
+                # The data starts on the line after the statement.
+                data = self._skip_line(end)
+                statement.data_start = self.base + data
+                data_end, end = self._copy_data_end(data)
+                statement.data_end = self.base + data_end
+                statement.end = self.base + end
+
+            i = end
+            yield statement
+
+
+def iter_statements(source: Union[str, BinaryIO], block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[Statement]:
+    """Yield the statements of a SQL file, given by path or as a binary file object, as it is read."""
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source, 'rb') as f:
+            yield from Tokenizer(f, block_size).statements()
+    else:
+        yield from Tokenizer(source, block_size).statements()
+
+
+def split_sql(sql_text: str) -> Iterator[Statement]:
+    """Yield the statements of a SQL string; offsets are those of its UTF-8 encoding."""
+    return iter_statements(io.BytesIO(sql_text.encode('utf-8')))
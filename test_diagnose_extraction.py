@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the dump validator's scan: statements hidden in quoted text or
+comments must not be counted, and nothing after them may be missed.
+
+Run with: python -m pytest -q test_diagnose_extraction.py
+"""
+
+import gzip
+
+import pytest
+
+from diagnose_extraction import scan_dump
+
+
+def scan(tmp_path, sql: str, name: str = "dump.sql"):
+    """Write `sql` to a dump file and return its (counts, names, data bytes, bytes scanned)."""
+    path = tmp_path / name
+    if name.endswith(".gz"):
+        with gzip.open(path, "wb") as f:
+            f.write(sql.encode())
+    else:
+        path.write_bytes(sql.encode())
+    return scan_dump(path)
+
+
+def test_escape_string_quote_does_not_hide_later_statements(tmp_path):
+    counts, names, _, _ = scan(tmp_path, "INSERT INTO a VALUES (E'it\\'s');\nCREATE TABLE c (id int);\n")
+
+    assert counts['INSERT'] == 1
+    assert counts['TABLE'] == 1
+    assert names['TABLE'] == {'c'}
+
+
+def test_block_comments_are_not_counted(tmp_path):
+    sql = ("/* CREATE TABLE ghost (id int PRIMARY KEY);\n"
+           "   /* nested */\n"
+           "CREATE TABLE ghost2 (id int);\n"
+           "*/\n"
+           "CREATE TABLE real (id int PRIMARY KEY);\n")
+    counts, names, _, _ = scan(tmp_path, sql)
+
+    assert counts['TABLE'] == 1
+    assert counts['PRIMARY KEY'] == 1
+    assert names['TABLE'] == {'real'}
+
+
+@pytest.mark.parametrize("name", ["dump.sql", "dump.sql.gz"])
+def test_quoted_text_and_copy_data_are_skipped(tmp_path, name):
+    sql = ("CREATE TABLE public.first (id int);\n"
+           "COMMENT ON TABLE public.first IS 'has $$ and -- in it';\n"
+           "CREATE FUNCTION public.f() RETURNS text LANGUAGE sql AS $body$\n"
+           "CREATE TABLE in_body (id int);\n"
+           "$body$;\n"
+           "COPY public.first (id) FROM stdin;\n"
+           "1\n"
+           "2\n"
+           "\\.\n"
+           "-- CREATE TABLE in_comment (id int);\n"
+           "CREATE TABLE public.last (id int);\n")
+    counts, names, data_bytes, scanned = scan(tmp_path, sql, name)
+
+    assert counts['TABLE'] == 2
+    assert counts['FUNCTION'] == 1
+    assert counts['COPY'] == 1
+    assert names['TABLE'] == {'first', 'last'}
+    assert data_bytes == len("1\n2\n")
+    assert scanned == len(sql.encode())
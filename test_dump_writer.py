@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming dump writer and the renderers feeding it: peak
+memory of a dump must not depend on how many large function bodies it
+holds.
+
+Run with: python -m pytest -q test_dump_writer.py
+"""
+
+import tracemalloc
+
+import pytest
+
+from dump_writer import DumpWriter
+from extract_schema_via_api import SupabaseSQLExtractor
+from extract_supabase_schema import SupabaseSchemaExtractor
+
+BODY_SIZE = 256 * 1024
+
+
+def function_definition(number: int, size: int = BODY_SIZE) -> str:
+    """A CREATE FUNCTION statement, without its semicolon, with a body of about `size` characters."""
+    return (f"CREATE OR REPLACE FUNCTION public.f{number}() RETURNS text LANGUAGE sql AS $$\n"
+            f"SELECT '{'x' * size}';\n"
+            f"$$")
+
+
+def function_bodies(count: int, size: int = BODY_SIZE):
+    """Yield `count` CREATE FUNCTION statements with bodies of about `size` characters, one at a time."""
+    for number in range(count):
+        yield function_definition(number, size) + ";\n\n"
+
+
+def catalog_snapshot(count: int):
+    """A catalog snapshot, as from_snapshot() loads it, of one table and `count` large functions."""
+    column = {"table_name": "t", "column_name": "id", "data_type": "integer", "character_maximum_length": None,
+              "numeric_precision": 32, "numeric_scale": 0, "is_nullable": "NO", "column_default": None,
+              "ordinal_position": 1, "udt_name": "int4"}
+    functions = [{"function_name": f"f{number}", "arguments": "", "definition": function_definition(number)}
+                 for number in range(count)]
+    return {"bulk": False, "schema": "public", "entries": [
+        [["sequences"], []],
+        [["tables"], ["t"]],
+        [["columns", "t"], [column]],
+        [["primary_keys", "t"], {"table_name": "t", "constraint_name": "t_pkey", "columns": "id"}],
+        [["unique_constraints", "t"], []],
+        [["indexes", "t"], []],
+        [["foreign_keys", "t"], []],
+        [["triggers", "t"], []],
+        [["functions"], functions],
+        [["views"], []],
+        [["policies"], []],
+    ]}
+
+
+def rpc_snapshot(count: int):
+    """A schema_snapshot() response of one table and `count` large functions."""
+    column = {"column_name": "id", "data_type": "integer", "character_maximum_length": None,
+              "numeric_precision": 32, "numeric_scale": 0, "is_nullable": "NO", "column_default": None,
+              "ordinal_position": 1, "udt_name": "int4"}
+    return {
+        "tables": ["t"],
+        "columns": {"t": [column]},
+        "primary_keys": {"t": [{"constraint_name": "t_pkey", "columns": "id"}]},
+        "foreign_keys": {},
+        "indexes": {},
+        "views": [],
+        "functions": [{"function_name": f"f{number}", "definition": function_definition(number)}
+                      for number in range(count)],
+        "policies": [],
+    }
+
+
+def peak_memory(write) -> int:
+    """Run write(); return the peak it allocates, in bytes, on top of what exists before."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        write()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def assert_flat(small: int, large: int):
+    # 4x the bodies may cost a little allocator noise, not another body per function.
+    assert large < small + 2 * BODY_SIZE
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_peak_memory_does_not_grow_with_function_count(tmp_path, compression):
+    def write(path, count):
+        with DumpWriter(str(path), compression=compression) as writer:
+            writer.write_all(function_bodies(count))
+
+    # Both runs are large enough (10 and 40 MB) to fill the compression queue,
+    # which is the writer's only other bounded buffer.
+    small = peak_memory(lambda: write(tmp_path / "small.sql", 40))
+    large = peak_memory(lambda: write(tmp_path / "large.sql", 160))
+
+    assert (tmp_path / "large.sql").stat().st_size > (tmp_path / "small.sql").stat().st_size
+    assert_flat(small, large)
+
+
+def test_schema_extractor_dump_memory_does_not_grow_with_function_count(tmp_path):
+    # The catalogs hold the bodies before tracing starts; only rendering and writing are measured.
+    small_extractor = SupabaseSchemaExtractor.from_snapshot(catalog_snapshot(40))
+    large_extractor = SupabaseSchemaExtractor.from_snapshot(catalog_snapshot(160))
+
+    small = peak_memory(lambda: small_extractor.generate_sql_dump(str(tmp_path / "small.sql")))
+    large = peak_memory(lambda: large_extractor.generate_sql_dump(str(tmp_path / "large.sql")))
+
+    assert (tmp_path / "large.sql").read_text().count("CREATE OR REPLACE FUNCTION") == 160
+    assert_flat(small, large)
+
+
+@pytest.mark.parametrize("extract", ["extract_complete_schema", "extract_complete_schema_snapshot"])
+def test_rest_extractor_dump_memory_does_not_grow_with_function_count(tmp_path, monkeypatch, extract):
+    def extractor(count):
+        # Answers both the per-query path (_extract_sections) and the one-call snapshot path.
+        snapshot = rpc_snapshot(count)
+        results = {SupabaseSQLExtractor.TABLES_QUERY: [{"table_name": "t"}],
+                   SupabaseSQLExtractor.FUNCTIONS_QUERY: snapshot["functions"]}
+        rest = SupabaseSQLExtractor("http://localhost", "anon")
+        monkeypatch.setattr(rest, "call_rpc", lambda function_name, payload=None: snapshot)
+        monkeypatch.setattr(rest, "execute_sql", lambda query, phase=None: results.get(query, []))
+        return getattr(rest, extract)
+
+    small_extract, large_extract = extractor(40), extractor(160)
+
+    small = peak_memory(lambda: small_extract(str(tmp_path / "small.sql")))
+    large = peak_memory(lambda: large_extract(str(tmp_path / "large.sql")))
+
+    assert (tmp_path / "large.sql").read_text().count("CREATE OR REPLACE FUNCTION") == 160
+    assert_flat(small, large)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the REST extractor's rendering of a schema_snapshot() document.
+
+Run with: python -m pytest -q test_extract_schema_via_api.py
+"""
+
+from extract_schema_via_api import SupabaseSQLExtractor
+
+# A schema_snapshot() response, as PostgREST decodes it: arrays arrive as lists.
+SNAPSHOT = {
+    "tables": ["orgs", "members"],
+    "columns": {
+        "orgs": [{"column_name": "id", "data_type": "integer", "character_maximum_length": None,
+                  "numeric_precision": 32, "numeric_scale": 0, "is_nullable": "NO", "column_default": None,
+                  "ordinal_position": 1, "udt_name": "int4"}],
+        "members": [{"column_name": "org_id", "data_type": "integer", "character_maximum_length": None,
+                     "numeric_precision": 32, "numeric_scale": 0, "is_nullable": "NO", "column_default": None,
+                     "ordinal_position": 1, "udt_name": "int4"}],
+    },
+    "primary_keys": {"orgs": [{"constraint_name": "orgs_pkey", "columns": "id"}]},
+    "foreign_keys": {"members": [{"constraint_name": "members_org_fk", "column_name": "org_id",
+                                  "referenced_table": "orgs", "referenced_column": "id",
+                                  "delete_rule": "CASCADE", "update_rule": "NO ACTION"}]},
+    "indexes": {},
+    "views": [],
+    "functions": [],
+    "policies": [
+        {"tablename": "members", "policyname": "members_read", "permissive": "PERMISSIVE",
+         "roles": ["authenticated", "service_role"], "qual": "true", "with_check": None},
+        {"tablename": "orgs", "policyname": "orgs_read", "permissive": "PERMISSIVE",
+         "roles": [], "qual": "true", "with_check": None},
+    ],
+}
+
+
+def test_snapshot_renders_policy_roles_as_sql(tmp_path, monkeypatch):
+    extractor = SupabaseSQLExtractor("http://localhost", "anon")
+    monkeypatch.setattr(extractor, "call_rpc", lambda function_name, payload=None: SNAPSHOT)
+    output = tmp_path / "dump.sql"
+
+    assert extractor.extract_complete_schema_snapshot(str(output))
+
+    dump = output.read_text()
+    assert "CREATE POLICY members_read ON members\n" in dump
+    assert "    TO authenticated, service_role\n" in dump
+    assert "CREATE POLICY orgs_read ON orgs\n" in dump
+    assert "    TO PUBLIC\n" in dump
+    assert "[" not in dump
+    assert "    FOREIGN KEY (org_id)\n    REFERENCES orgs (id)\n    ON DELETE CASCADE;" in dump
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the outputs rendered from a catalog snapshot: schema names are
+quoted wherever the dump names them, and re-rendering an unchanged catalog
+must rewrite the dump and metadata byte for byte.
+
+Run with: python -m pytest -q test_extract_supabase_schema.py
+"""
+
+import json
+
+from extract_supabase_schema import SupabaseSchemaExtractor, run_file_name, write_outputs
+from restore_schema import dump_statements, plan_restore
+
+COLUMN = {"table_name": "t", "column_name": "id", "data_type": "integer", "character_maximum_length": None,
+          "numeric_precision": 32, "numeric_scale": 0, "is_nullable": "NO", "column_default": None,
+          "ordinal_position": 1, "udt_name": "int4"}
+CATALOG = {"bulk": False, "schema": "public", "entries": [
+    [["fingerprint"], "abc123"],
+    [["sequences"], []],
+    [["tables"], ["t"]],
+    [["columns", "t"], [COLUMN]],
+    [["primary_keys", "t"], {"table_name": "t", "constraint_name": "t_pkey", "columns": "id"}],
+    [["unique_constraints", "t"], []],
+    [["indexes", "t"], []],
+    [["foreign_keys", "t"], []],
+    [["triggers", "t"], []],
+    [["functions"], [{"function_name": "f", "arguments": "",
+                      "definition": "CREATE OR REPLACE FUNCTION public.f() RETURNS int LANGUAGE sql AS $$ SELECT 1 $$"}]],
+    [["views"], []],
+    [["policies"], []],
+]}
+
+
+def test_unchanged_catalog_rewrites_identical_metadata(tmp_path):
+    outputs = []
+    for run in ("first", "second"):
+        metadata_file = tmp_path / f"{run}.json"
+        assert write_outputs(SupabaseSchemaExtractor.from_snapshot(CATALOG), str(tmp_path / f"{run}.sql"),
+                             str(metadata_file))
+        outputs.append(((tmp_path / f"{run}.sql").read_bytes(), metadata_file.read_bytes()))
+
+    assert outputs[0] == outputs[1]
+    metadata = json.loads(outputs[0][1])
+    assert metadata["catalog_fingerprint"] == "abc123"
+    assert "generated" not in metadata and "catalog_round_trips" not in metadata
+
+    run = json.loads((tmp_path / run_file_name("first.json")).read_text())
+    assert set(run) == {"generated", "catalog_round_trips"}
+
+
+def test_schema_names_are_quoted(tmp_path):
+    extractor = SupabaseSchemaExtractor.from_snapshot({**CATALOG, "schema": 'Tenant "A"'})
+    output = tmp_path / "dump.sql"
+
+    assert extractor.generate_sql_dump(str(output))
+
+    dump = output.read_text()
+    assert 'CREATE SCHEMA IF NOT EXISTS "Tenant ""A""";\n' in dump
+    assert 'SET search_path TO "Tenant ""A""", public;\n' in dump
+    assert 'DROP TABLE IF EXISTS "Tenant ""A""".t CASCADE;\n' in dump
+    assert plan_restore(dump_statements(str(output)))['search_path'] == ['Tenant "A"', 'public']